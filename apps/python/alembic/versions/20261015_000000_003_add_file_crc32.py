@@ -0,0 +1,33 @@
+"""Add CRC32 to file_hashes
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-15
+
+This migration stores each file's CRC32 so album ZIP downloads can be
+streamed straight from storage. Existing rows are filled on first download.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# Revision identifiers
+revision: str = "003"
+down_revision: str | None = "002"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Add crc32 column to file_hashes table."""
+    op.add_column(
+        "file_hashes",
+        sa.Column("crc32", sa.BigInteger(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Remove crc32 column from file_hashes table."""
+    op.drop_column("file_hashes", "crc32")
@@ -10,7 +10,6 @@ from core.config import UPLOAD_DIR
 from core.database import get_db
 from fastapi import (
     APIRouter,
-    BackgroundTasks,
     Depends,
     File,
     HTTPException,
@@ -533,12 +532,11 @@ async def complete_chunked_upload(
                 data = await chunk_f.read()
                 await out_f.write(data)
 
-    # Process the assembled file using storage service
-    async with aiofiles.open(temp_file, "rb") as f:
-        stored = await storage_service.store_file_streaming(
-            file=f,
-            original_filename=filename,
-        )
+    # Move the assembled file into storage (hashed in place, no second copy)
+    stored = await storage_service.store_local_file(
+        path=temp_file,
+        original_filename=filename,
+    )
 
     # Clean up chunks directory
     shutil.rmtree(upload_dir)
@@ -569,6 +567,7 @@ async def complete_chunked_upload(
             file_size=stored.file_size,
             width=stored.width or 0,
             height=stored.height or 0,
+            crc32=stored.crc32,
             reference_count=1,
         )
         db.add(file_hash)
@@ -657,6 +656,7 @@ async def upload_photos_to_album(
                 file_size=stored.file_size,
                 width=stored.width or 0,
                 height=stored.height or 0,
+                crc32=stored.crc32,
                 reference_count=1,
             )
             db.add(file_hash)
@@ -854,7 +854,6 @@ async def download_photo(
 async def download_all_photos(
     album_id: uuid.UUID,
     request: Request,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
 ):
     """Download all photos in an album as a zip file."""
@@ -871,6 +870,7 @@ async def download_all_photos(
         select(Photo)
         .where(Photo.album_id == album_id)
         .options(selectinload(Photo.file_hash))
+        .order_by(Photo.sort_order, Photo.id)
     )
     result = await db.execute(stmt)
     photos = result.scalars().all()
@@ -878,7 +878,7 @@ async def download_all_photos(
     if not photos:
         raise HTTPException(status_code=404, detail="No photos in album")
 
-    return create_photos_zip(photos, album.title, UPLOAD_DIR, request, background_tasks)
+    return await create_photos_zip(photos, album.title, UPLOAD_DIR, request, db)
 
 
 @router.post("/{album_id}/photos/bulk-download")
@@ -886,7 +886,6 @@ async def bulk_download_photos(
     album_id: uuid.UUID,
     photo_ids: list[uuid.UUID],
     request: Request,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
 ):
     """Download multiple photos as a zip file."""
@@ -898,6 +897,7 @@ async def bulk_download_photos(
         select(Photo)
         .where(Photo.id.in_(photo_ids), Photo.album_id == album_id)
         .options(selectinload(Photo.file_hash))
+        .order_by(Photo.sort_order, Photo.id)
     )
     result = await db.execute(stmt)
     photos = result.scalars().all()
@@ -911,7 +911,7 @@ async def bulk_download_photos(
     album = album_result.scalar_one_or_none()
     album_name = album.title if album else "photos"
 
-    return create_photos_zip(photos, album_name, UPLOAD_DIR, request, background_tasks)
+    return await create_photos_zip(photos, album_name, UPLOAD_DIR, request, db)
 
 
 @router.post("/{album_id}/photos/{photo_id}/regenerate-thumbnails", status_code=200)
@@ -36,9 +36,10 @@ from utils.security_util import (
     generate_qr_code_data_url,
     generate_totp_secret,
     get_totp_uri,
-    hash_password,
-    verify_backup_code,
-    verify_password,
+    hash_password_async,
+    password_needs_rehash,
+    verify_backup_code_async,
+    verify_password_async,
     verify_totp_code,
 )
 
@@ -124,7 +125,7 @@ async def register(
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Create admin
-    password_hash = hash_password(data.password)
+    password_hash = await hash_password_async(data.password)
     admin = Admin(
         email=data.email,
         password_hash=password_hash,
@@ -164,9 +165,14 @@ async def login(
     result = await db.execute(stmt)
     admin = result.scalar_one_or_none()
 
-    if not admin or not verify_password(data.password, admin.password_hash):
+    if not admin or not await verify_password_async(data.password, admin.password_hash):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
+    # Transparently upgrade legacy bcrypt hashes now that we have the plaintext
+    if password_needs_rehash(admin.password_hash):
+        admin.password_hash = await hash_password_async(data.password)
+        await db.commit()
+
     # Check if 2FA is enabled
     if admin.totp_enabled and admin.totp_secret:
         # Return temporary token for 2FA verification
@@ -239,10 +245,10 @@ async def change_password(
     db: AsyncSession = Depends(get_db),
 ):
     """Change the current admin's password."""
-    if not verify_password(data.current_password, admin.password_hash):
+    if not await verify_password_async(data.current_password, admin.password_hash):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
 
-    admin.password_hash = hash_password(data.new_password)
+    admin.password_hash = await hash_password_async(data.new_password)
     await db.commit()
 
     return {"message": "Password changed successfully"}
@@ -342,7 +348,9 @@ async def verify_2fa(
         raise HTTPException(status_code=401, detail="Invalid verification code")
 
     # Try backup code (8 hex characters)
-    is_valid, new_backup_codes = verify_backup_code(admin.backup_codes, code)
+    is_valid, new_backup_codes = await verify_backup_code_async(
+        admin.backup_codes, code
+    )
     if is_valid:
         # Update backup codes (remove used one)
         admin.backup_codes = new_backup_codes
@@ -404,7 +412,7 @@ async def enable_2fa(
     and the user's password for security confirmation.
     """
     # Verify password
-    if not verify_password(data.password, admin.password_hash):
+    if not await verify_password_async(data.password, admin.password_hash):
         raise HTTPException(status_code=401, detail="Invalid password")
 
     # Check if secret exists (from setup)
@@ -437,7 +445,7 @@ async def disable_2fa(
     Requires the current TOTP code (or backup code) and password.
     """
     # Verify password
-    if not verify_password(data.password, admin.password_hash):
+    if not await verify_password_async(data.password, admin.password_hash):
         raise HTTPException(status_code=401, detail="Invalid password")
 
     if not admin.totp_enabled:
@@ -453,7 +461,7 @@ async def disable_2fa(
 
     # Try backup code if TOTP failed
     if not code_valid:
-        is_valid, _ = verify_backup_code(admin.backup_codes, code)
+        is_valid, _ = await verify_backup_code_async(admin.backup_codes, code)
         code_valid = is_valid
 
     if not code_valid:
@@ -497,7 +505,7 @@ async def regenerate_backup_codes(
     Returns new backup codes (old ones are invalidated).
     """
     # Verify password
-    if not verify_password(data.password, admin.password_hash):
+    if not await verify_password_async(data.password, admin.password_hash):
         raise HTTPException(status_code=401, detail="Invalid password")
 
     if not admin.totp_enabled or not admin.totp_secret:
@@ -15,7 +15,8 @@ from models.db.admin_db_models import Admin
 from models.db.file_hash_db_models import FileHash
 from models.db.photo_db_models import Photo
 from models.db.share_link_db_models import ShareLink
-from utils.security_util import verify_password
+from services.storage_service import storage_service
+from utils.security_util import verify_password_async
 from utils.jwt_util import get_admin_id_from_token
 
 router = APIRouter(prefix="/files", tags=["files"])
@@ -83,6 +84,30 @@ def get_file_path(
         raise HTTPException(status_code=400, detail="Invalid variant")
 
 
+async def resolve_file_path(
+    file_hash: str, variant: str, extension: str, is_video: bool = False
+) -> Path:
+    """
+    Get the path to serve for a hash and variant.
+
+    Missing image web/thumbnail variants are generated on first request;
+    if that fails the original is served instead.
+    """
+    file_path = get_file_path(file_hash, variant, extension, is_video)
+    if variant != "original" and not is_video:
+        # Waits for any in-flight job before trusting the variant on disk
+        if await storage_service.ensure_thumbnails(file_hash, extension):
+            return file_path
+        file_path = get_file_path(file_hash, "original", extension)
+    elif variant != "original" and not file_path.exists():
+        # Fallback to original if variant doesn't exist
+        file_path = get_file_path(file_hash, "original", extension, is_video)
+
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="File not found")
+    return file_path
+
+
 # --- Authenticated File Access (Admin only) ---
 
 
@@ -122,19 +147,10 @@ async def get_authenticated_photo(
 
     file_hash = photo.file_hash
     is_video = photo.is_video
-    file_path = get_file_path(
+    file_path = await resolve_file_path(
         file_hash.sha256_hash, variant, file_hash.file_extension, is_video
     )
 
-    if not file_path.exists():
-        # Fallback to original if variant doesn't exist
-        if variant != "original":
-            file_path = get_file_path(
-                file_hash.sha256_hash, "original", file_hash.file_extension, is_video
-            )
-        if not file_path.exists():
-            raise HTTPException(status_code=404, detail="File not found")
-
     # For videos, use proper mime type; for images use webp for variants
     if is_video and variant != "thumbnail":
         media_type = file_hash.mime_type
@@ -176,13 +192,7 @@ async def get_authenticated_file_by_hash(
     if not fh:
         raise HTTPException(status_code=404, detail="File not found")
 
-    file_path = get_file_path(file_hash, variant, fh.file_extension)
-
-    if not file_path.exists():
-        if variant != "original":
-            file_path = get_file_path(file_hash, "original", fh.file_extension)
-        if not file_path.exists():
-            raise HTTPException(status_code=404, detail="File not found")
+    file_path = await resolve_file_path(file_hash, variant, fh.file_extension)
 
     media_type = "image/webp" if variant in ("thumbnail", "web") else fh.mime_type
 
@@ -244,7 +254,7 @@ async def get_shared_photo(
     if share_link.is_password_protected:
         if not password:
             raise HTTPException(status_code=401, detail="Password required")
-        if not verify_password(password, share_link.password_hash):
+        if not await verify_password_async(password, share_link.password_hash):
             raise HTTPException(status_code=401, detail="Invalid password")
 
     # Verify photo belongs to shared album
@@ -261,18 +271,10 @@ async def get_shared_photo(
 
     file_hash = photo.file_hash
     is_video = photo.is_video
-    file_path = get_file_path(
+    file_path = await resolve_file_path(
         file_hash.sha256_hash, variant, file_hash.file_extension, is_video
     )
 
-    if not file_path.exists():
-        if variant != "original":
-            file_path = get_file_path(
-                file_hash.sha256_hash, "original", file_hash.file_extension, is_video
-            )
-        if not file_path.exists():
-            raise HTTPException(status_code=404, detail="File not found")
-
     # For videos, use proper mime type; for images use webp for variants
     if is_video and variant != "thumbnail":
         media_type = file_hash.mime_type
@@ -320,7 +322,7 @@ async def get_shared_file_by_hash(
     if share_link.is_password_protected:
         if not password:
             raise HTTPException(status_code=401, detail="Password required")
-        if not verify_password(password, share_link.password_hash):
+        if not await verify_password_async(password, share_link.password_hash):
             raise HTTPException(status_code=401, detail="Invalid password")
 
     # Verify the file hash belongs to a photo in the shared album
@@ -344,15 +346,7 @@ async def get_shared_file_by_hash(
         raise HTTPException(status_code=404, detail="File not found")
 
     is_video = photo.is_video
-    file_path = get_file_path(file_hash, variant, fh.file_extension, is_video)
-
-    if not file_path.exists():
-        if variant != "original":
-            file_path = get_file_path(
-                file_hash, "original", fh.file_extension, is_video
-            )
-        if not file_path.exists():
-            raise HTTPException(status_code=404, detail="File not found")
+    file_path = await resolve_file_path(file_hash, variant, fh.file_extension, is_video)
 
     # For videos, use proper mime type; for images use webp for variants
     if is_video and variant != "thumbnail":
@@ -15,7 +15,7 @@ from models.api.share_links_api_models import (
 )
 from models.db.album_db_models import Album
 from models.db.share_link_db_models import ShareLink
-from utils.security_util import generate_token, hash_password
+from utils.security_util import generate_token, hash_password_async
 from utils.url_util import build_share_url
 
 router = APIRouter(prefix="/albums", tags=["share-links"])
@@ -44,7 +44,7 @@ async def create_share_link(
     password_hash = None
     is_password_protected = False
     if data.password:
-        password_hash = hash_password(data.password)
+        password_hash = await hash_password_async(data.password)
         is_password_protected = True
 
     # Validate custom slug uniqueness if provided
@@ -160,7 +160,7 @@ async def update_share_link(
     # Update fields
     if data.password is not None:
         if data.password:
-            share_link.password_hash = hash_password(data.password)
+            share_link.password_hash = await hash_password_async(data.password)
             share_link.is_password_protected = True
         else:
             # Empty password means remove protection
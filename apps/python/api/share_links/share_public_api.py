@@ -5,7 +5,7 @@ from datetime import datetime, timezone
 
 from core.config import UPLOAD_DIR
 from core.database import get_db
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from models.api.share_links_api_models import (
     SharedAlbumPhotoResponse,
     SharedAlbumResponse,
@@ -18,7 +18,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from utils.download_util import ResumableFileResponse, create_photos_zip
-from utils.security_util import verify_password
+from utils.security_util import verify_password_async
 
 router = APIRouter(prefix="/share", tags=["share-public"])
 
@@ -144,7 +144,7 @@ async def access_shared_album(
                 requires_password=True,
             )
 
-        if not share_link.password_hash or not verify_password(
+        if not share_link.password_hash or not await verify_password_async(
             data.password, share_link.password_hash
         ):
             raise HTTPException(status_code=401, detail="Invalid password")
@@ -231,7 +231,7 @@ async def _validate_share_link(
     if share_link.is_password_protected:
         if not password:
             raise HTTPException(status_code=401, detail="Password required")
-        if not share_link.password_hash or not verify_password(
+        if not share_link.password_hash or not await verify_password_async(
             password, share_link.password_hash
         ):
             raise HTTPException(status_code=401, detail="Invalid password")
@@ -284,7 +284,6 @@ async def download_shared_photo(
 async def download_all_shared_photos(
     token: str,
     request: Request,
-    background_tasks: BackgroundTasks,
     password: str | None = Query(None),
     db: AsyncSession = Depends(get_db),
 ):
@@ -308,6 +307,7 @@ async def download_all_shared_photos(
         select(Photo)
         .where(Photo.album_id == share_link.album_id)
         .options(selectinload(Photo.file_hash))
+        .order_by(Photo.sort_order, Photo.id)
     )
     photos_result = await db.execute(photos_stmt)
     photos = photos_result.scalars().all()
@@ -315,4 +315,4 @@ async def download_all_shared_photos(
     if not photos:
         raise HTTPException(status_code=404, detail="No photos in album")
 
-    return create_photos_zip(photos, album.title, UPLOAD_DIR, request, background_tasks)
+    return await create_photos_zip(photos, album.title, UPLOAD_DIR, request, db)
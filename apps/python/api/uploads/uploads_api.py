@@ -1,6 +1,6 @@
 """Upload API endpoints."""
 
-from fastapi import APIRouter, Depends, File, UploadFile
+from fastapi import APIRouter, Depends, File, Header, UploadFile
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -35,6 +35,7 @@ async def _create_or_update_file_hash(
             file_size=result.file_size,
             width=result.width or 0,
             height=result.height or 0,
+            crc32=result.crc32,
             reference_count=1,
         )
         db.add(file_hash)
@@ -47,6 +48,7 @@ async def _create_or_update_file_hash(
 @router.post("/upload", response_model=UploadResponse)
 async def upload_file(
     file: UploadFile = File(...),
+    x_content_sha256: str | None = Header(None),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -54,10 +56,12 @@ async def upload_file(
 
     Streams the file to disk efficiently - supports large files (videos, RAW images).
     Images are deduplicated by SHA256 hash. Videos get a unique UUID.
+    Clients may send X-Content-SHA256 so known images skip hashing and storage.
     """
     result = await storage_service.store_file_streaming(
         file=file.file,
         original_filename=file.filename or "unnamed",
+        content_sha256=x_content_sha256,
     )
 
     # Save to database (skip for videos since they use UUID not hash)
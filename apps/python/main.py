@@ -6,7 +6,9 @@ from core.rate_limit import limiter
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from PIL import __version__ as PILLOW_VERSION
 from router import router
+from services.storage_service import shutdown_image_pool, storage_service
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from utils.cleanup_util import (
@@ -23,10 +25,14 @@ async def lifespan(app: FastAPI):
     await init_db()
     print("✓ Database initialized")
 
-    # Ensure upload directory exists
-    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    # Ensure upload directories exist (once, not per request)
+    storage_service.ensure_directories()
     print(f"✓ Upload directory ready: {UPLOAD_DIR}")
 
+    # Pillow-SIMD builds carry a ".postN" version suffix
+    pillow_build = "Pillow-SIMD" if ".post" in PILLOW_VERSION else "Pillow"
+    print(f"✓ Image processing: {pillow_build} {PILLOW_VERSION}")
+
     # Clean up any orphaned temp files from previous runs
     cleanup_old_temp_files(UPLOAD_DIR)
     print("✓ Startup temp file cleanup complete")
@@ -37,8 +43,9 @@ async def lifespan(app: FastAPI):
 
     yield
 
-    # Shutdown: Cancel cleanup task
+    # Shutdown: Cancel cleanup task and stop image workers
     await stop_cleanup_task()
+    shutdown_image_pool()
     print("✓ Shutting down")
 
 
@@ -59,7 +66,13 @@ app.add_middleware(
     allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type", "Accept", "X-Requested-With"],
+    allow_headers=[
+        "Authorization",
+        "Content-Type",
+        "Accept",
+        "X-Requested-With",
+        "X-Content-SHA256",
+    ],
 )
 
 app.include_router(router)
@@ -46,6 +46,10 @@ class FileHash(Base):
     # File size in bytes
     file_size: Mapped[int] = mapped_column(BigInteger, nullable=False)
 
+    # CRC32 of the file contents, needed for ZIP entries (filled at upload,
+    # or on first download for files stored before it was tracked)
+    crc32: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+
     # Image dimensions
     width: Mapped[int] = mapped_column(Integer, nullable=False)
     height: Mapped[int] = mapped_column(Integer, nullable=False)
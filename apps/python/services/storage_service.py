@@ -2,16 +2,26 @@
 
 import asyncio
 import hashlib
+import inspect
+import io
 import json
+import multiprocessing
+import os
+import re
 import subprocess
+import sys
 import uuid
+import zlib
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
 from datetime import datetime
 from functools import partial
 from pathlib import Path
 from typing import BinaryIO
 
-import aiofiles
 from core.config import (
     THUMBNAIL_QUALITY,
     THUMBNAIL_SIZE,
@@ -25,9 +35,204 @@ from PIL.ExifTags import TAGS
 # Chunk size for streaming (8MB - optimized for large RAW/video files)
 CHUNK_SIZE = 8 * 1024 * 1024
 
+# Videos are not hashed, so chunks are batched into one writev() per 32MB
+VIDEO_WRITE_BATCH_SIZE = 32 * 1024 * 1024
+
+# SHA256 constructor for dedup keys, bound once at import. hashlib's OpenSSL
+# backend dispatches to SHA-NI/AVX2 at runtime when the CPU supports it, and
+# large contiguous update() calls (CHUNK_SIZE) amortize the per-call overhead.
+# The hash is a content address, not a security primitive. It is also the
+# persisted file ID (FileHash.sha256_hash, storage paths, X-Content-SHA256),
+# so a faster hash would mean re-keying every stored file; with SHA-NI the
+# ingest path is bound by disk and network, not by this digest.
+_sha256 = partial(hashlib.sha256, usedforsecurity=False)
+
+# Early dedup: digest of an upload's first bytes -> SHA256 of the stored file.
+# A hit lets a re-upload of a known file skip the temp-file write entirely;
+# the full SHA256 is still computed to confirm the match.
+DEDUP_PREFIX_SIZE = 1024 * 1024
+DEDUP_PREFIX_CACHE_SIZE = 4096
+_dedup_prefixes: OrderedDict[bytes, str] = OrderedDict()
+
+# A client-supplied content hash must look like one of our file IDs
+_SHA256_HEX = re.compile(r"[0-9a-f]{64}")
+
+# Parent directories this process has already created (2-level sharding
+# means up to 65536 per variant), so repeat uploads skip the mkdir syscalls.
+# Module-level so it stays per-process and isn't pickled into image workers.
+_known_dirs: set[Path] = set()
+
 # Background tasks for video thumbnail generation
 _background_tasks: set[asyncio.Task] = set()
 
+# In-flight image thumbnail jobs by file ID, shared by the post-upload
+# background task and any request that needs the variants before it's done
+_thumbnail_jobs: dict[str, asyncio.Task] = {}
+
+# Process pool for CPU-bound image work (decode/resize/encode), created lazily
+_image_pool: ProcessPoolExecutor | None = None
+
+
+def get_image_pool() -> ProcessPoolExecutor:
+    """Get the process pool used for thumbnail generation."""
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _image_pool
+
+
+def _save_webp(img: Image.Image, path: Path, quality: int) -> None:
+    """Encode a WebP variant under a temp name, then move it into place."""
+    # Same directory, so os.replace is an atomic rename and a concurrent
+    # request never serves a half-encoded file
+    temp_path = path.with_name(f"temp_{uuid.uuid4().hex}.webp")
+    try:
+        img.save(temp_path, "WEBP", quality=quality)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def _discard_image_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next get_image_pool() starts a fresh one."""
+    global _image_pool
+    # Concurrent jobs fail on the same pool; only the first replaces it
+    if _image_pool is pool:
+        _image_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _ensure_dir(path: Path) -> None:
+    """Create a directory (and parents) unless this process already did."""
+    if path not in _known_dirs:
+        path.mkdir(parents=True, exist_ok=True)
+        _known_dirs.add(path)
+
+
+def _open_for_write(path: Path) -> int:
+    """Open a raw file descriptor for a sequential streaming write."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    return fd
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """Write a whole buffer to a file descriptor (os.write may be partial)."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def _writev_all(fd: int, buffers: list[bytes]) -> None:
+    """Write a list of buffers with as few writev() calls as possible."""
+    views = [memoryview(buffer) for buffer in buffers]
+    while views:
+        written = os.writev(fd, views)
+        while views and written >= len(views[0]):
+            written -= len(views.pop(0))
+        if written:
+            views[0] = views[0][written:]
+
+
+def _file_digests(path: Path) -> tuple[str, int]:
+    """SHA256 and CRC32 of a file already on disk, in a single read pass."""
+    sha256 = _sha256()
+    crc = 0
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as fh:
+        while n := fh.readinto(buffer):
+            crc = _update_digests(sha256, crc, view[:n])
+    return sha256.hexdigest(), crc
+
+
+def _writev_crc(fd: int, buffers: list[bytes], crc: int) -> int:
+    """Write a batch of buffers and return the CRC32 updated over them."""
+    for buffer in buffers:
+        crc = zlib.crc32(buffer, crc)
+    _writev_all(fd, buffers)
+    return crc
+
+
+def _update_digests(sha256: "hashlib._Hash", crc: int, chunk: bytes) -> int:
+    """Feed a chunk to the SHA256 and return the updated CRC32 (both GIL-free)."""
+    sha256.update(chunk)
+    return zlib.crc32(chunk, crc)
+
+
+async def _iter_chunks(file: BinaryIO) -> AsyncIterator[bytes]:
+    """Yield CHUNK_SIZE reads from a sync or async file until EOF."""
+    read = getattr(file, "read", None)
+    if read is None:
+        return
+    # Decide sync vs async once, not per chunk
+    if inspect.iscoroutinefunction(read):
+        while chunk := await read(CHUNK_SIZE):
+            yield chunk
+    else:
+        while chunk := read(CHUNK_SIZE):
+            yield chunk
+
+
+def _remaining_size(file: BinaryIO) -> int | None:
+    """Bytes left to read in a sync, seekable source (None if unknown)."""
+    if not isinstance(file, io.IOBase) or not file.seekable():
+        return None
+    position = file.tell()
+    size = file.seek(0, os.SEEK_END) - position
+    file.seek(position)
+    return size
+
+
+def _source_fd(file: BinaryIO) -> int | None:
+    """File descriptor of a sync, disk-backed source that sendfile() can copy."""
+    if sys.platform != "linux" or not isinstance(file, io.IOBase):
+        return None
+    try:
+        # Spooled uploads roll over to a real temp file here
+        return file.fileno()
+    except OSError:
+        return None
+
+
+def _sendfile_all(out_fd: int, in_fd: int, offset: int) -> int:
+    """Copy in_fd from offset to EOF into out_fd in the kernel."""
+    size = os.fstat(in_fd).st_size - offset
+    copied = 0
+    while copied < size:
+        sent = os.sendfile(out_fd, in_fd, offset + copied, size - copied)
+        if not sent:
+            break
+        copied += sent
+    return copied
+
+
+def _prefix_key(chunk: bytes) -> bytes:
+    """Digest of the first DEDUP_PREFIX_SIZE bytes of an upload."""
+    prefix = memoryview(chunk)[:DEDUP_PREFIX_SIZE]
+    return hashlib.blake2b(prefix, digest_size=16, usedforsecurity=False).digest()
+
+
+def _remember_prefix(key: bytes, file_id: str) -> None:
+    """Record an upload prefix in the bounded LRU dedup index."""
+    _dedup_prefixes[key] = file_id
+    _dedup_prefixes.move_to_end(key)
+    if len(_dedup_prefixes) > DEDUP_PREFIX_CACHE_SIZE:
+        _dedup_prefixes.popitem(last=False)
+
+
+def shutdown_image_pool() -> None:
+    """Shut down the thumbnail process pool."""
+    global _image_pool
+    if _image_pool:
+        _image_pool.shutdown(wait=True, cancel_futures=True)
+        _image_pool = None
+
 
 @dataclass
 class StoredFile:
@@ -43,6 +248,7 @@ class StoredFile:
     is_duplicate: bool
     is_video: bool
     captured_at: datetime | None = None  # EXIF date for images
+    crc32: int | None = None  # Computed while hashing; ZIP downloads reuse it
 
 
 class StorageService:
@@ -88,12 +294,16 @@ class StorageService:
         ".m2ts": "video/mp2t",
     }
 
+    # Merged lookups for the per-upload hot path (keys are lowercase)
+    _EXT_TO_MIME = {**IMAGE_MIME_TYPES, **VIDEO_MIME_TYPES}
+    _VIDEO_EXTS = frozenset(VIDEO_MIME_TYPES)
+
     def __init__(self, upload_dir: Path | None = None):
         self.upload_dir = upload_dir or UPLOAD_DIR
-        self._ensure_directories()
+        self._upload_dir_str = os.fspath(self.upload_dir)
 
-    def _ensure_directories(self) -> None:
-        """Create upload directories if they don't exist."""
+    def ensure_directories(self) -> None:
+        """Create upload directories if they don't exist (run at startup)."""
         for variant in [
             self.VARIANT_ORIGINAL,
             self.VARIANT_THUMBNAIL,
@@ -105,7 +315,7 @@ class StorageService:
 
     def is_video(self, extension: str) -> bool:
         """Check if extension is a video format."""
-        return extension.lower() in self.VIDEO_MIME_TYPES
+        return extension.lower() in self._VIDEO_EXTS
 
     def is_image(self, extension: str) -> bool:
         """Check if extension is an image format."""
@@ -117,39 +327,38 @@ class StorageService:
 
         Uses 2-level directory sharding: ab/cd/abcd1234...ext
         """
-        shard1 = file_id[:2]
-        shard2 = file_id[2:4]
-        filename = f"{file_id}{extension}"
-        return self.upload_dir / variant / shard1 / shard2 / filename
+        return Path(
+            f"{self._upload_dir_str}/{variant}/{file_id[:2]}/{file_id[2:4]}/"
+            f"{file_id}{extension}"
+        )
+
+    def _is_stored(self, file_id: str, extension: str) -> bool:
+        """Check whether an original with this ID is already in storage."""
+        return self._get_storage_path(
+            file_id, self.VARIANT_ORIGINAL, extension
+        ).exists()
 
     def _get_video_path(self, file_id: str, extension: str) -> Path:
         """Get storage path for video files (no sharding needed)."""
-        return self.upload_dir / "videos" / f"{file_id}{extension}"
+        return Path(f"{self._upload_dir_str}/videos/{file_id}{extension}")
 
     def _get_relative_path(self, file_id: str, variant: str, extension: str) -> str:
         """Get the relative path (for database storage)."""
-        shard1 = file_id[:2]
-        shard2 = file_id[2:4]
-        filename = f"{file_id}{extension}"
-        return f"{variant}/{shard1}/{shard2}/{filename}"
+        return f"{variant}/{file_id[:2]}/{file_id[2:4]}/{file_id}{extension}"
 
     def _get_relative_video_path(self, file_id: str, extension: str) -> str:
         """Get relative path for video files."""
         return f"videos/{file_id}{extension}"
 
     def get_mime_type(self, extension: str) -> str:
-        """Get MIME type from file extension."""
-        ext = extension.lower()
-        if ext in self.IMAGE_MIME_TYPES:
-            return self.IMAGE_MIME_TYPES[ext]
-        if ext in self.VIDEO_MIME_TYPES:
-            return self.VIDEO_MIME_TYPES[ext]
-        return "application/octet-stream"
+        """Get MIME type from an already-lowercased file extension."""
+        return self._EXT_TO_MIME.get(extension, "application/octet-stream")
 
     async def store_file_streaming(
         self,
         file: BinaryIO,
         original_filename: str,
+        content_sha256: str | None = None,
     ) -> StoredFile:
         """
         Store a file using streaming (memory-efficient for large files).
@@ -160,21 +369,68 @@ class StorageService:
         Args:
             file: File-like object supporting async read
             original_filename: Original filename for extension and metadata
+            content_sha256: Client-computed SHA256 of the file, if sent. When
+                it names a stored image of the same size, the upload is
+                reported as a duplicate without being hashed or written.
 
         Returns:
             StoredFile with file details
         """
-        extension = Path(original_filename).suffix.lower()
-        if not extension:
-            extension = ".bin"
+        extension = Path(original_filename).suffix.lower() or ".bin"
 
         # Handle videos differently - no hashing, use UUID
-        if self.is_video(extension):
+        if extension in self._VIDEO_EXTS:
             return await self._store_video_streaming(file, extension)
 
+        if content_sha256 and self._matches_stored(file, content_sha256, extension):
+            try:
+                return await self._finalize_image(
+                    None, content_sha256.lower(), extension, _remaining_size(file)
+                )
+            except FileNotFoundError:
+                # Deleted since the check; nothing has been read, so fall
+                # through and store the upload normally
+                pass
+
         # For images: stream to temp, hash, then move
         return await self._store_image_streaming(file, extension)
 
+    async def store_local_file(
+        self,
+        path: Path,
+        original_filename: str,
+    ) -> StoredFile:
+        """
+        Store a file that is already on disk under upload_dir.
+
+        Used for assembled chunked uploads: the file is moved into storage
+        instead of copied, and images are hashed after the fact by
+        _file_digests, which computes SHA256 and CRC32 in one readinto() pass.
+        Takes ownership of path.
+
+        Args:
+            path: File on the same filesystem as upload_dir
+            original_filename: Original filename for extension and metadata
+
+        Returns:
+            StoredFile with file details
+        """
+        extension = Path(original_filename).suffix.lower() or ".bin"
+        file_size = path.stat().st_size
+
+        if extension in self._VIDEO_EXTS:
+            file_id = uuid.uuid4().hex
+            storage_path = self._get_video_path(file_id, extension)
+            _ensure_dir(storage_path.parent)
+            path.rename(storage_path)
+            return await self._finalize_video(
+                storage_path, file_id, extension, file_size
+            )
+
+        loop = asyncio.get_event_loop()
+        file_id, crc = await loop.run_in_executor(None, _file_digests, path)
+        return await self._finalize_image(path, file_id, extension, file_size, crc)
+
     async def _store_video_streaming(
         self,
         file: BinaryIO,
@@ -188,27 +444,57 @@ class StorageService:
         file_id = uuid.uuid4().hex
 
         storage_path = self._get_video_path(file_id, extension)
-        storage_path.parent.mkdir(parents=True, exist_ok=True)
+        _ensure_dir(storage_path.parent)
 
         # Stream directly to final location
         file_size = 0
-        async with aiofiles.open(storage_path, "wb") as f:
-            while True:
-                # Support both sync and async read
-                if hasattr(file, "read"):
-                    chunk = file.read(CHUNK_SIZE)
-                    # Handle coroutines from UploadFile
-                    if hasattr(chunk, "__await__"):
-                        chunk = await chunk
-                else:
-                    break
+        crc: int | None = None
+        loop = asyncio.get_event_loop()
+        fd = await loop.run_in_executor(None, _open_for_write, storage_path)
+        try:
+            in_fd = _source_fd(file)
+            if in_fd is not None:
+                # Zero-copy: let the kernel move the bytes file-to-file
+                start = file.tell()
+                file_size = await loop.run_in_executor(
+                    None, _sendfile_all, fd, in_fd, start
+                )
+                file.seek(start + file_size)
+            else:
+                # Bytes pass through userspace here, so CRC32 them on the way
+                crc = 0
+                batch: list[bytes] = []
+                batch_size = 0
+                async for chunk in _iter_chunks(file):
+                    batch.append(chunk)
+                    batch_size += len(chunk)
+                    file_size += len(chunk)
 
-                if not chunk:
-                    break
+                    if batch_size >= VIDEO_WRITE_BATCH_SIZE:
+                        crc = await loop.run_in_executor(
+                            None, _writev_crc, fd, batch, crc
+                        )
+                        batch = []
+                        batch_size = 0
 
-                await f.write(chunk)
-                file_size += len(chunk)
+                if batch:
+                    crc = await loop.run_in_executor(None, _writev_crc, fd, batch, crc)
+        finally:
+            os.close(fd)
 
+        return await self._finalize_video(
+            storage_path, file_id, extension, file_size, crc
+        )
+
+    async def _finalize_video(
+        self,
+        storage_path: Path,
+        file_id: str,
+        extension: str,
+        file_size: int,
+        crc32: int | None = None,
+    ) -> StoredFile:
+        """Probe a stored video and schedule its thumbnails."""
         # Get video dimensions quickly with ffprobe (fast operation)
         width, height = await self._get_video_dimensions(storage_path)
 
@@ -225,6 +511,7 @@ class StorageService:
             height=height,
             is_duplicate=False,
             is_video=True,
+            crc32=crc32,
         )
 
     async def _store_image_streaming(
@@ -233,73 +520,48 @@ class StorageService:
         extension: str,
     ) -> StoredFile:
         """Store image file with streaming and SHA256 deduplication."""
-        # Stream to temp file while computing hash
         temp_path = self.upload_dir / f"temp_{uuid.uuid4().hex}{extension}"
-        sha256 = hashlib.sha256()
-        file_size = 0
-
-        try:
-            async with aiofiles.open(temp_path, "wb") as f:
-                while True:
-                    # Support both sync and async read
-                    if hasattr(file, "read"):
-                        chunk = file.read(CHUNK_SIZE)
-                        if hasattr(chunk, "__await__"):
-                            chunk = await chunk
-                    else:
-                        break
-
-                    if not chunk:
-                        break
 
-                    await f.write(chunk)
-                    sha256.update(chunk)
-                    file_size += len(chunk)
+        # Only sync, seekable sources can skip the temp write for a known
+        # prefix, since a false match has to be re-streamed from the start
+        start = None
+        if isinstance(file, io.IOBase) and file.seekable():
+            start = file.tell()
 
-            file_id = sha256.hexdigest()
-
-            # Check for duplicate
-            storage_path = self._get_storage_path(
-                file_id, self.VARIANT_ORIGINAL, extension
+        try:
+            file_id, file_size, crc, prefix_key, written = await self._stream_image(
+                file, temp_path, extension, allow_skip=start is not None
             )
-            is_duplicate = storage_path.exists()
-
-            if is_duplicate:
-                # File already exists, delete temp
-                temp_path.unlink()
-                # Check if thumbnails exist, generate if missing
-                thumb_path = self._get_storage_path(
-                    file_id, self.VARIANT_THUMBNAIL, ".webp"
+            stored = None
+            if not written:
+                try:
+                    stored = await self._finalize_image(
+                        None, file_id, extension, file_size, crc
+                    )
+                except FileNotFoundError:
+                    # Prefix matched a file that differs (or was since
+                    # deleted), so there is no stored copy and no temp file:
+                    # start over
+                    file.seek(start)
+                    (
+                        file_id,
+                        file_size,
+                        crc,
+                        prefix_key,
+                        written,
+                    ) = await self._stream_image(
+                        file, temp_path, extension, allow_skip=False
+                    )
+
+            if stored is None:
+                stored = await self._finalize_image(
+                    temp_path, file_id, extension, file_size, crc
                 )
-                web_path = self._get_storage_path(file_id, self.VARIANT_WEB, ".webp")
-                if not thumb_path.exists() or not web_path.exists():
-                    await self._generate_thumbnails(storage_path, file_id, extension)
-            else:
-                # Move temp to final location
-                storage_path.parent.mkdir(parents=True, exist_ok=True)
-                temp_path.rename(storage_path)
 
-                # Generate thumbnails for images
-                await self._generate_thumbnails(storage_path, file_id, extension)
+            if prefix_key is not None:
+                _remember_prefix(prefix_key, file_id)
 
-            # Get dimensions and EXIF date
-            width, height = self.get_image_dimensions(storage_path)
-            captured_at = self.get_exif_date(storage_path)
-
-            return StoredFile(
-                file_id=file_id,
-                storage_path=self._get_relative_path(
-                    file_id, self.VARIANT_ORIGINAL, extension
-                ),
-                file_extension=extension,
-                mime_type=self.get_mime_type(extension),
-                file_size=file_size,
-                width=width,
-                height=height,
-                is_duplicate=is_duplicate,
-                is_video=False,
-                captured_at=captured_at,
-            )
+            return stored
 
         except Exception:
             # Clean up temp file on error
@@ -307,34 +569,159 @@ class StorageService:
                 temp_path.unlink()
             raise
 
-    def get_image_dimensions(self, file_path: Path) -> tuple[int, int]:
-        """Get width and height of an image."""
+    def _matches_stored(self, file: BinaryIO, sha256_hex: str, extension: str) -> bool:
+        """Check a client SHA256 hint against storage (name and size only)."""
+        sha256_hex = sha256_hex.lower()
+        if not _SHA256_HEX.fullmatch(sha256_hex):
+            return False
+        size = _remaining_size(file)
+        if size is None:
+            return False
+        storage_path = self._get_storage_path(
+            sha256_hex, self.VARIANT_ORIGINAL, extension
+        )
+        try:
+            return storage_path.stat().st_size == size
+        except FileNotFoundError:
+            return False
+
+    async def _finalize_image(
+        self,
+        temp_path: Path | None,
+        file_id: str,
+        extension: str,
+        file_size: int,
+        crc32: int | None = None,
+    ) -> StoredFile:
+        """
+        Move a hashed temp file into storage (or drop it as a duplicate).
+
+        temp_path is None when the caller never wrote the upload because it
+        matched a stored original. If that original has gone by now,
+        FileNotFoundError is raised so the caller can stream the upload.
+        """
+        # Check for duplicate
+        storage_path = self._get_storage_path(file_id, self.VARIANT_ORIGINAL, extension)
+        is_duplicate = storage_path.exists()
+
+        if is_duplicate:
+            # File already exists, delete temp (if one was written)
+            if temp_path is not None:
+                temp_path.unlink(missing_ok=True)
+        elif temp_path is None:
+            raise FileNotFoundError(f"Stored original disappeared: {storage_path}")
+        else:
+            # Move temp to final location
+            _ensure_dir(storage_path.parent)
+            temp_path.rename(storage_path)
+
+        # Get dimensions and EXIF date (header only); web and thumbnail
+        # variants are generated in the background so the upload doesn't
+        # wait on decode/resize/encode
+        width, height, captured_at = self.get_image_info(storage_path)
+        if not self._has_thumbnails(file_id):
+            self._schedule_image_thumbnails(storage_path, file_id, extension)
+
+        return StoredFile(
+            file_id=file_id,
+            storage_path=self._get_relative_path(
+                file_id, self.VARIANT_ORIGINAL, extension
+            ),
+            file_extension=extension,
+            mime_type=self.get_mime_type(extension),
+            file_size=file_size,
+            width=width,
+            height=height,
+            is_duplicate=is_duplicate,
+            is_video=False,
+            captured_at=captured_at,
+            crc32=crc32,
+        )
+
+    async def _stream_image(
+        self,
+        file: BinaryIO,
+        temp_path: Path,
+        extension: str,
+        allow_skip: bool,
+    ) -> tuple[str, int, int, bytes | None, bool]:
+        """
+        Stream an image to a temp file while computing its SHA256 and CRC32.
+
+        If allow_skip is set and the first chunk matches the prefix of a file
+        already in storage, chunks are only hashed and never written.
+
+        Returns:
+            Tuple of (sha256_hex, file_size, crc32, prefix_key, written)
+        """
+        sha256 = _sha256()
+        crc = 0
+        file_size = 0
+        prefix_key = None
+        fd = None
+        loop = asyncio.get_event_loop()
+
+        try:
+            async for chunk in _iter_chunks(file):
+                if prefix_key is None:
+                    prefix_key = _prefix_key(chunk)
+                    known_id = _dedup_prefixes.get(prefix_key) if allow_skip else None
+                    if not known_id or not self._is_stored(known_id, extension):
+                        fd = await loop.run_in_executor(
+                            None, _open_for_write, temp_path
+                        )
+
+                digest = partial(_update_digests, sha256, crc, chunk)
+                if fd is None:
+                    crc = await loop.run_in_executor(None, digest)
+                else:
+                    # Hash in a worker thread while the write is in flight
+                    # (hashlib and zlib release the GIL for large buffers)
+                    write = loop.run_in_executor(None, _write_all, fd, chunk)
+                    try:
+                        crc = await loop.run_in_executor(None, digest)
+                    finally:
+                        await write
+                file_size += len(chunk)
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+        if prefix_key is None:
+            # Empty upload: still produce an (empty) temp file
+            os.close(_open_for_write(temp_path))
+            return sha256.hexdigest(), 0, crc, None, True
+
+        return sha256.hexdigest(), file_size, crc, prefix_key, fd is not None
+
+    def get_image_info(self, file_path: Path) -> tuple[int, int, datetime | None]:
+        """Get width, height and EXIF captured date with a single open."""
         try:
             with Image.open(file_path) as img:
-                return img.size
+                width, height = img.size
+                return width, height, self._read_exif_date(img)
         except Exception:
-            return (0, 0)
+            return 0, 0, None
 
-    def get_exif_date(self, file_path: Path) -> datetime | None:
-        """Extract the captured date from EXIF data."""
+    def _read_exif_date(self, img: Image.Image) -> datetime | None:
+        """Extract the captured date from an open image's EXIF data."""
         try:
-            with Image.open(file_path) as img:
-                exif = img.getexif()
-                if not exif:
-                    return None
-
-                # Try DateTimeOriginal (when photo was taken)
-                for tag_id, value in exif.items():
-                    tag = TAGS.get(tag_id, tag_id)
-                    if tag == "DateTimeOriginal":
-                        # Format: "2023:12:25 14:30:45"
-                        return datetime.strptime(value, "%Y:%m:%d %H:%M:%S")
-
-                # Fallback to DateTime if DateTimeOriginal not found
-                for tag_id, value in exif.items():
-                    tag = TAGS.get(tag_id, tag_id)
-                    if tag == "DateTime":
-                        return datetime.strptime(value, "%Y:%m:%d %H:%M:%S")
+            exif = img.getexif()
+            if not exif:
+                return None
+
+            # Try DateTimeOriginal (when photo was taken)
+            for tag_id, value in exif.items():
+                tag = TAGS.get(tag_id, tag_id)
+                if tag == "DateTimeOriginal":
+                    # Format: "2023:12:25 14:30:45"
+                    return datetime.strptime(value, "%Y:%m:%d %H:%M:%S")
+
+            # Fallback to DateTime if DateTimeOriginal not found
+            for tag_id, value in exif.items():
+                tag = TAGS.get(tag_id, tag_id)
+                if tag == "DateTime":
+                    return datetime.strptime(value, "%Y:%m:%d %H:%M:%S")
         except Exception:
             pass
         return None
@@ -348,19 +735,9 @@ class StorageService:
         """Generate thumbnail and web-optimized versions (synchronous)."""
         try:
             with Image.open(original_path) as img:
-                # Convert to RGB if necessary (for PNG with transparency, etc.)
-                if img.mode in ("RGBA", "P"):
-                    img = img.convert("RGB")
-
-                thumb = img.copy()
-                thumb.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
-                thumb_path = self._get_storage_path(
-                    file_id, self.VARIANT_THUMBNAIL, ".webp"
-                )
-                thumb_path.parent.mkdir(parents=True, exist_ok=True)
-                thumb.save(thumb_path, "WEBP", quality=THUMBNAIL_QUALITY)
+                is_jpeg = img.format == "JPEG"
 
-                web = img.copy()
+                web_size = None
                 max_dim = WEB_MAX_DIMENSION
                 if img.width > max_dim or img.height > max_dim:
                     if img.width > img.height:
@@ -369,27 +746,71 @@ class StorageService:
                     else:
                         new_height = max_dim
                         new_width = int((max_dim / img.height) * img.width)
-                    web = web.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                    web_size = (new_width, new_height)
+
+                    if is_jpeg:
+                        # libjpeg IDCT scaling: decode at 1/2, 1/4 or 1/8 size,
+                        # never smaller than the web target
+                        img.draft(None, web_size)
+
+                # Convert to RGB if necessary (for PNG with transparency, etc.).
+                # Full-size buffers are closed as soon as they're superseded
+                # so at most two are resident (50MP RGBA+RGB is ~350MB)
+                if img.mode in ("RGBA", "P"):
+                    rgb = img.convert("RGB")
+                    img.close()
+                    img = rgb
+
+                # resize() returns a new image, so the source needs no copy.
+                # reducing_gap box-shrinks by an integer factor first so
+                # Lanczos only covers the last 2-4x; this is the shrink-on-load
+                # that draft() can't give non-JPEG sources (same default as
+                # thumbnail())
+                web = img
+                if web_size and img.size != web_size:
+                    web = img.resize(
+                        web_size, Image.Resampling.LANCZOS, reducing_gap=2.0
+                    )
+                    # Encoding and the thumbnail only need the web image
+                    img.close()
 
                 web_path = self._get_storage_path(file_id, self.VARIANT_WEB, ".webp")
-                web_path.parent.mkdir(parents=True, exist_ok=True)
-                web.save(web_path, "WEBP", quality=WEB_QUALITY)
+                _ensure_dir(web_path.parent)
+                _save_webp(web, web_path, WEB_QUALITY)
+
+                # Pyramid: downscale the (much smaller) web image to the
+                # thumbnail instead of resizing the full source a second time
+                self._save_thumbnail(web, file_id)
         except Exception:
             # Non-standard image format, skip thumbnails
             pass
 
+    def _save_thumbnail(self, img: Image.Image, file_id: str) -> None:
+        """Shrink an image in place to thumbnail size and save it."""
+        img.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+        thumb_path = self._get_storage_path(file_id, self.VARIANT_THUMBNAIL, ".webp")
+        _ensure_dir(thumb_path.parent)
+        _save_webp(img, thumb_path, THUMBNAIL_QUALITY)
+
     async def _generate_thumbnails(
         self,
         original_path: Path,
         file_id: str,
         extension: str,
     ) -> None:
-        """Generate thumbnail and web-optimized versions (async, runs in thread pool)."""
+        """Generate thumbnail and web versions (async, runs in the image pool)."""
         loop = asyncio.get_event_loop()
-        await loop.run_in_executor(
-            None,
-            partial(self._generate_thumbnails_sync, original_path, file_id, extension),
+        generate = partial(
+            self._generate_thumbnails_sync, original_path, file_id, extension
         )
+        pool = get_image_pool()
+        try:
+            await loop.run_in_executor(pool, generate)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed on a huge image), which breaks
+            # the whole pool; retry once on a fresh one
+            _discard_image_pool(pool)
+            await loop.run_in_executor(get_image_pool(), generate)
 
     async def _get_video_dimensions(self, video_path: Path) -> tuple[int, int]:
         """Get video dimensions using ffprobe (fast operation)."""
@@ -425,6 +846,70 @@ class StorageService:
 
         return 1920, 1080  # Default fallback
 
+    def _has_thumbnails(self, file_id: str) -> bool:
+        """Check whether an image's web and thumbnail variants are complete."""
+        # A running job may still be (re)writing them
+        task = _thumbnail_jobs.get(file_id)
+        if task is not None and not task.done():
+            return False
+        return (
+            self._get_storage_path(file_id, self.VARIANT_THUMBNAIL, ".webp").exists()
+            and self._get_storage_path(file_id, self.VARIANT_WEB, ".webp").exists()
+        )
+
+    def _schedule_image_thumbnails(
+        self, original_path: Path, file_id: str, extension: str
+    ) -> asyncio.Task:
+        """Start image thumbnail generation in background, or join a running job."""
+        task = _thumbnail_jobs.get(file_id)
+        if task is None:
+            loop = asyncio.get_event_loop()
+            task = loop.create_task(
+                self._generate_image_thumbnails_background(
+                    original_path, file_id, extension
+                )
+            )
+            # Also keeps a reference to prevent garbage collection
+            _thumbnail_jobs[file_id] = task
+            task.add_done_callback(lambda _: _thumbnail_jobs.pop(file_id, None))
+        return task
+
+    async def _generate_image_thumbnails_background(
+        self,
+        original_path: Path,
+        file_id: str,
+        extension: str,
+    ) -> None:
+        """Generate image thumbnails in background (called from background task)."""
+        try:
+            await self._generate_thumbnails(original_path, file_id, extension)
+        except Exception as e:
+            print(f"Background: Failed to generate thumbnails for {file_id}: {e}")
+
+    async def ensure_thumbnails(self, file_id: str, extension: str) -> bool:
+        """
+        Make sure an image's web and thumbnail variants exist.
+
+        Thumbnails are generated after the upload returns, so a request can
+        arrive first; this waits for (or starts) the job.
+
+        Returns True if the variants exist afterwards.
+        """
+        if self._has_thumbnails(file_id):
+            return True
+
+        original_path = self._get_storage_path(
+            file_id, self.VARIANT_ORIGINAL, extension
+        )
+        if not original_path.exists():
+            return False
+
+        # Shielded: a client disconnecting must not cancel the shared job
+        await asyncio.shield(
+            self._schedule_image_thumbnails(original_path, file_id, extension)
+        )
+        return self._has_thumbnails(file_id)
+
     def _schedule_background_thumbnails(self, video_path: Path, file_id: str) -> None:
         """Schedule video thumbnail generation in background (non-blocking)."""
         try:
@@ -467,7 +952,7 @@ class StorageService:
 
         # Generate thumbnail (small poster at 1 second)
         thumb_path = self._get_storage_path(file_id, self.VARIANT_THUMBNAIL, ".webp")
-        thumb_path.parent.mkdir(parents=True, exist_ok=True)
+        _ensure_dir(thumb_path.parent)
 
         try:
             # Scale to fit within THUMBNAIL_SIZE while maintaining aspect ratio
@@ -502,7 +987,7 @@ class StorageService:
 
         # Generate web version (larger poster)
         web_path = self._get_storage_path(file_id, self.VARIANT_WEB, ".webp")
-        web_path.parent.mkdir(parents=True, exist_ok=True)
+        _ensure_dir(web_path.parent)
 
         try:
             result = await loop.run_in_executor(
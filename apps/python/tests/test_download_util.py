@@ -0,0 +1,248 @@
+"""Tests for streamed and resumable downloads."""
+
+import io
+import os
+import zipfile
+import zlib
+
+import pytest
+from starlette.requests import Request
+
+from utils import download_util
+from utils.download_util import ResumableFileResponse, StreamingZipResponse, ZipEntry
+
+FILES = {
+    "first.jpg": os.urandom(3000),
+    "empty.txt": b"",
+    "café.png": os.urandom(5000),
+}
+
+
+def _request(range_header: str | None = None, if_range: str | None = None) -> Request:
+    headers = []
+    if range_header is not None:
+        headers.append((b"range", range_header.encode("latin-1")))
+    if if_range is not None:
+        headers.append((b"if-range", if_range.encode("latin-1")))
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+async def _fetch(response, zerocopy: bool = False) -> tuple[int, dict, bytes]:
+    """Run an ASGI response and collect its status, headers and body."""
+    scope = {"type": "http", "extensions": {}}
+    if zerocopy:
+        scope["extensions"]["http.response.zerocopysend"] = {}
+    messages = []
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopysend":
+            # What the server would copy with sendfile()
+            body = os.pread(
+                message["file"].fileno(), message["count"], message["offset"]
+            )
+            message = {**message, "body": body}
+        messages.append(dict(message))
+
+    await response(scope, None, send)
+
+    start, *body_messages = messages
+    assert start["type"] == "http.response.start"
+    # Exactly one final frame, and it's the last one
+    assert [m["more_body"] for m in body_messages][-1] is False
+    assert all(m["more_body"] for m in body_messages[:-1])
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    return start["status"], headers, b"".join(m["body"] for m in body_messages)
+
+
+@pytest.fixture
+def zip_entries(tmp_path) -> list[ZipEntry]:
+    entries = []
+    for name, data in FILES.items():
+        path = tmp_path / name
+        path.write_bytes(data)
+        entries.append(
+            ZipEntry(
+                path=str(path),
+                name=name,
+                size=len(data),
+                crc32=zlib.crc32(data),
+                mtime=path.stat().st_mtime,
+            )
+        )
+    return entries
+
+
+class TestStreamingZip:
+    """Tests for the hand-laid-out STORED ZIP stream."""
+
+    async def test_archive_is_valid(self, zip_entries):
+        """Test that zipfile accepts the archive and reads back every file."""
+        status, headers, body = await _fetch(
+            StreamingZipResponse(zip_entries, "album.zip", _request())
+        )
+
+        assert status == 200
+        assert int(headers["content-length"]) == len(body)
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            assert archive.testzip() is None
+            assert archive.namelist() == list(FILES)
+            for name, data in FILES.items():
+                assert archive.read(name) == data
+
+    @pytest.mark.parametrize("zerocopy", [False, True])
+    async def test_ranges_across_part_boundaries(self, zip_entries, zerocopy):
+        """Test ranges that start and end inside headers, file data and the trailer."""
+        _, _, full = await _fetch(
+            StreamingZipResponse(zip_entries, "album.zip", _request())
+        )
+        segments = StreamingZipResponse(zip_entries, "album.zip", _request()).segments
+        boundaries = [offset for offset, _, _ in segments[1:]]
+
+        ranges = [(b - 1, b) for b in boundaries]  # Straddle each boundary
+        ranges += [(b - 10, b + 10) for b in boundaries if b >= 10]
+        ranges += [(5, len(full) - 5), (boundaries[0], boundaries[-1] - 1)]
+        for start, end in ranges:
+            status, headers, body = await _fetch(
+                StreamingZipResponse(
+                    zip_entries, "album.zip", _request(f"bytes={start}-{end}")
+                ),
+                zerocopy=zerocopy,
+            )
+            assert status == 206
+            assert headers["content-range"] == f"bytes {start}-{end}/{len(full)}"
+            assert body == full[start : end + 1]
+
+    async def test_suffix_and_open_ended_ranges(self, zip_entries):
+        """Test bytes=-N and bytes=N- against the full body."""
+        _, _, full = await _fetch(
+            StreamingZipResponse(zip_entries, "album.zip", _request())
+        )
+
+        _, _, tail = await _fetch(
+            StreamingZipResponse(zip_entries, "album.zip", _request("bytes=-100"))
+        )
+        _, _, rest = await _fetch(
+            StreamingZipResponse(zip_entries, "album.zip", _request("bytes=100-"))
+        )
+
+        assert tail == full[-100:]
+        assert rest == full[100:]
+
+    @pytest.mark.parametrize(
+        "range_header",
+        ["bytes=abc", "bytes=0-1,5-6", "bytes=-", "bytes=20-10", "items=0-10"],
+    )
+    async def test_invalid_range_returns_full_archive(self, zip_entries, range_header):
+        """Test that malformed or multi-range headers fall back to a 200."""
+        _, _, full = await _fetch(
+            StreamingZipResponse(zip_entries, "album.zip", _request())
+        )
+
+        status, headers, body = await _fetch(
+            StreamingZipResponse(zip_entries, "album.zip", _request(range_header))
+        )
+
+        assert status == 200
+        assert "content-range" not in headers
+        assert body == full
+
+    async def test_unsatisfiable_range_returns_full_archive(self, zip_entries):
+        """Test that a range starting past the end falls back to a 200."""
+        _, _, full = await _fetch(
+            StreamingZipResponse(zip_entries, "album.zip", _request())
+        )
+
+        status, _, body = await _fetch(
+            StreamingZipResponse(
+                zip_entries, "album.zip", _request(f"bytes={len(full)}-")
+            )
+        )
+
+        assert status == 200
+        assert body == full
+
+    async def test_etag_tracks_entries(self, zip_entries):
+        """Test that the ETag is stable and changes with any entry's mtime."""
+        etag = StreamingZipResponse(zip_entries, "album.zip", _request()).etag
+        again = StreamingZipResponse(zip_entries, "album.zip", _request()).etag
+        zip_entries[1].mtime += 2
+
+        touched = StreamingZipResponse(zip_entries, "album.zip", _request()).etag
+
+        assert etag == again
+        assert touched != etag
+
+    async def test_if_range(self, zip_entries):
+        """Test that a range only applies while If-Range matches the ETag."""
+        status, headers, full = await _fetch(
+            StreamingZipResponse(zip_entries, "album.zip", _request())
+        )
+        etag = headers["etag"]
+
+        for if_range, expected_status, expected_body in [
+            (etag, 206, full[100:]),
+            ('"stale"', 200, full),
+            (f"W/{etag}", 200, full),
+        ]:
+            status, headers, body = await _fetch(
+                StreamingZipResponse(
+                    zip_entries, "album.zip", _request("bytes=100-", if_range)
+                )
+            )
+            assert status == expected_status
+            assert headers["etag"] == etag
+            assert body == expected_body
+
+
+class TestResumableFile:
+    """Tests for single-file downloads with Range support."""
+
+    @pytest.fixture
+    def video(self, tmp_path):
+        data = os.urandom(10_000)
+        path = tmp_path / "clip.mp4"
+        path.write_bytes(data)
+        return path, data
+
+    @pytest.mark.parametrize("zerocopy", [False, True])
+    @pytest.mark.parametrize(
+        "range_header, expected",
+        [
+            (None, slice(None)),
+            ("bytes=0-99", slice(0, 100)),
+            ("bytes=1000-8999", slice(1000, 9000)),
+            ("bytes=9990-", slice(9990, None)),
+            ("bytes=-4000", slice(6000, None)),
+            ("bytes=5000-20000", slice(5000, None)),
+        ],
+    )
+    async def test_ranges(self, video, monkeypatch, zerocopy, range_header, expected):
+        """Test the small-range pread path and the chunked/zero-copy path."""
+        # Small chunks so ranges over 1 KiB go through the chunked sender
+        monkeypatch.setattr(download_util, "CHUNK_SIZE", 1024)
+        path, data = video
+
+        status, headers, body = await _fetch(
+            ResumableFileResponse(
+                path, "clip.mp4", "video/mp4", _request(range_header)
+            ),
+            zerocopy=zerocopy,
+        )
+
+        assert body == data[expected]
+        assert int(headers["content-length"]) == len(body)
+        assert headers["accept-ranges"] == "bytes"
+        assert status == (200 if range_header is None else 206)
+
+    @pytest.mark.parametrize("range_header", ["bytes=10000-", "bytes=x-1", "bytes=-"])
+    async def test_bad_range_returns_full_file(self, video, range_header):
+        """Test that unsatisfiable or malformed ranges fall back to a 200."""
+        path, data = video
+
+        status, headers, body = await _fetch(
+            ResumableFileResponse(path, "clip.mp4", "video/mp4", _request(range_header))
+        )
+
+        assert status == 200
+        assert "content-range" not in headers
+        assert body == data
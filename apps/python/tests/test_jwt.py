@@ -0,0 +1,67 @@
+"""Tests for JWT token utilities."""
+
+import errno
+import os
+import stat
+import uuid
+
+from utils.jwt_util import (
+    _decode_access_token,
+    _get_or_create_jwt_secret,
+    create_access_token,
+    create_refresh_token,
+    verify_access_token,
+)
+
+
+class TestAccessTokens:
+    """Tests for access token verification and its decode cache."""
+
+    def test_verify_access_token_returns_copy(self):
+        """Test that mutating a verified payload doesn't leak into later calls."""
+        admin_id = uuid.uuid4()
+        token, _ = create_access_token(admin_id, "admin@example.com")
+
+        payload = verify_access_token(token)
+        payload["sub"] = "tampered"
+
+        assert verify_access_token(token)["sub"] == str(admin_id)
+
+    def test_invalid_tokens_are_not_cached(self):
+        """Test that junk and wrong-type tokens don't take up cache slots."""
+        refresh_token, _ = create_refresh_token(uuid.uuid4())
+        _decode_access_token.cache_clear()
+
+        assert verify_access_token("not-a-jwt") is None
+        assert verify_access_token(refresh_token) is None
+        assert _decode_access_token.cache_info().currsize == 0
+
+
+class TestJwtSecretFile:
+    """Tests for the auto-generated JWT secret file."""
+
+    def test_existing_secret_file_is_made_private(self, tmp_path, monkeypatch):
+        """Test that a secret written by an older version is chmodded to 0600."""
+        monkeypatch.delenv("JWT_SECRET")
+        secret_file = tmp_path / ".jwt_secret"
+        secret_file.write_text("existing-secret\n")
+        secret_file.chmod(0o644)
+
+        assert _get_or_create_jwt_secret(tmp_path) == "existing-secret"
+        assert stat.S_IMODE(secret_file.stat().st_mode) == 0o600
+
+    def test_falls_back_when_hard_links_unsupported(self, tmp_path, monkeypatch):
+        """Test the exclusive-create fallback on filesystems without link()."""
+        monkeypatch.delenv("JWT_SECRET")
+
+        def no_link(src, dst):
+            raise OSError(errno.EPERM, "Operation not permitted")
+
+        monkeypatch.setattr(os, "link", no_link)
+
+        secret = _get_or_create_jwt_secret(tmp_path)
+        secret_file = tmp_path / ".jwt_secret"
+
+        assert secret_file.read_text() == secret
+        assert stat.S_IMODE(secret_file.stat().st_mode) == 0o600
+        assert [p.name for p in tmp_path.iterdir()] == [".jwt_secret"]
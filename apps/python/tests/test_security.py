@@ -1,12 +1,29 @@
 """Tests for security utilities."""
 
+import base64
+import io
+import json
+import time
+
+import bcrypt
+import pyotp
+import segno
+from PIL import Image
+
 from utils.security_util import (
+    decode_backup_codes,
     encode_backup_codes,
     generate_backup_codes,
+    generate_qr_code_data_url,
     generate_token,
+    generate_totp_secret,
+    get_totp_uri,
     hash_password,
+    password_needs_rehash,
     verify_backup_code,
+    verify_backup_code_async,
     verify_password,
+    verify_totp_code,
 )
 
 
@@ -42,6 +59,15 @@ class TestPasswordHashing:
         assert verify_password(password, hash1) is True
         assert verify_password(password, hash2) is True
 
+    def test_verify_legacy_bcrypt_hash(self):
+        """Test that bcrypt hashes still verify and are flagged for rehash."""
+        password = "securepassword123"
+        legacy = bcrypt.hashpw(password.encode(), bcrypt.gensalt(4)).decode()
+        assert verify_password(password, legacy) is True
+        assert verify_password("wrongpassword", legacy) is False
+        assert password_needs_rehash(legacy) is True
+        assert password_needs_rehash(hash_password(password)) is False
+
 
 class TestBackupCodes:
     """Tests for 2FA backup code functions."""
@@ -61,7 +87,7 @@ class TestBackupCodes:
         codes = generate_backup_codes(count=3)
         for code in codes:
             assert len(code) == 8
-            assert code.isupper()
+            assert code == code.upper()
             # Should be valid hex
             int(code, 16)
 
@@ -114,6 +140,33 @@ class TestBackupCodes:
         is_valid, _ = verify_backup_code(encoded, codes[0].lower())
         assert is_valid is True
 
+    async def test_verify_legacy_bcrypt_backup_code(self):
+        """Test that bcrypt-hashed codes from before the SHA-256 switch still work."""
+        legacy = [
+            bcrypt.hashpw(code.encode(), bcrypt.gensalt(4)).decode()
+            for code in ("AAAA1111", "BBBB2222")
+        ]
+        encoded = json.dumps(legacy)
+
+        is_valid, remaining = verify_backup_code(encoded, "bbbb-2222")
+        assert is_valid is True
+        assert decode_backup_codes(remaining) == legacy[:1]
+
+        is_valid, remaining = await verify_backup_code_async(encoded, "AAAA1111")
+        assert is_valid is True
+        assert decode_backup_codes(remaining) == legacy[1:]
+
+    def test_verify_backup_code_duplicate_slots(self):
+        """Test that a code stored twice only uses up one slot, and the right one."""
+        legacy = bcrypt.hashpw(b"AAAA1111", bcrypt.gensalt(4)).decode()
+        current = decode_backup_codes(encode_backup_codes(["AAAA1111"]))
+        other = decode_backup_codes(encode_backup_codes(["BBBB2222"]))
+        encoded = "\n".join([legacy, *current, *other])
+
+        is_valid, remaining = verify_backup_code(encoded, "AAAA1111")
+        assert is_valid is True
+        assert decode_backup_codes(remaining) == current + other
+
     def test_verify_backup_code_empty(self):
         """Test verifying against empty/None encoded codes."""
         is_valid, remaining = verify_backup_code(None, "ANYCODE1")
@@ -123,6 +176,67 @@ class TestBackupCodes:
         is_valid, remaining = verify_backup_code("", "ANYCODE1")
         assert is_valid is False
 
+    def test_verify_backup_code_malformed(self):
+        """Test that codes of the wrong shape are rejected outright."""
+        encoded = encode_backup_codes(generate_backup_codes(count=3))
+
+        for code in ("", "ABC", "ABCDEF012", "GHIJKLMN"):
+            is_valid, remaining = verify_backup_code(encoded, code)
+            assert is_valid is False
+            assert remaining is None
+
+
+class TestTotp:
+    """Tests for TOTP verification."""
+
+    def test_verify_totp_code(self):
+        """Test current codes verify, with or without a space in the middle."""
+        secret = generate_totp_secret()
+        code = pyotp.TOTP(secret).now()
+
+        assert verify_totp_code(secret, code) is True
+        assert verify_totp_code(secret, f"{code[:3]} {code[3:]}") is True
+
+    def test_verify_totp_code_drift(self):
+        """Test codes one step either side are accepted, older ones are not."""
+        secret = generate_totp_secret()
+        totp = pyotp.TOTP(secret)
+        now = time.time()
+
+        assert verify_totp_code(secret, totp.at(now - 30)) is True
+        assert verify_totp_code(secret, totp.at(now + 30)) is True
+        assert verify_totp_code(secret, totp.at(now - 90)) is False
+
+    def test_verify_totp_code_malformed(self):
+        """Test that codes of the wrong shape are rejected."""
+        secret = generate_totp_secret()
+
+        for code in ("", "12345", "1234567", "12345a", "١٢٣٤٥٦"):
+            assert verify_totp_code(secret, code) is False
+
+
+class TestQrCode:
+    """Tests for the hand-packed 2FA QR PNG."""
+
+    def test_png_matches_segno_matrix(self):
+        """Test that every module decodes to the colour segno puts there."""
+        uri = get_totp_uri(generate_totp_secret(), "admin@example.com")
+        matrix = segno.make_qr(uri, error="l").matrix
+        scale, border = 10, 4
+
+        data_url = generate_qr_code_data_url(uri)
+        prefix, _, encoded = data_url.partition(",")
+
+        assert prefix == "data:image/png;base64"
+        with Image.open(io.BytesIO(base64.b64decode(encoded))) as img:
+            assert img.mode == "1"
+            side = (len(matrix) + 2 * border) * scale
+            assert img.size == (side, side)
+            for y, row in enumerate(matrix):
+                for x, dark in enumerate(row):
+                    pixel = img.getpixel(((border + x) * scale, (border + y) * scale))
+                    assert (pixel == 0) == bool(dark), (x, y)
+
 
 class TestTokenGeneration:
     """Tests for token generation."""
@@ -0,0 +1,277 @@
+"""Tests for the storage service."""
+
+import asyncio
+import hashlib
+import io
+import os
+import zlib
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from api.files import files_api
+from services import storage_service as storage_module
+from services.storage_service import StorageService
+
+
+def _jpeg_bytes(size: tuple[int, int] = (64, 48)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, (120, 30, 200)).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+class _BrokenPool:
+    """Stands in for a process pool whose worker was killed."""
+
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        raise BrokenProcessPool("A child process terminated abruptly")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def storage(tmp_path) -> StorageService:
+    """A storage service rooted in a fresh temp directory."""
+    service = StorageService(tmp_path)
+    service.ensure_directories()
+    return service
+
+
+class TestImageDeduplication:
+    """Tests for the paths that skip writing a known upload."""
+
+    async def test_reupload_skips_temp_write(self, storage, monkeypatch):
+        """Test that a known file is hashed but never written again."""
+        data = _jpeg_bytes()
+        first = await storage.store_file_streaming(io.BytesIO(data), "a.jpg")
+        opened = []
+        open_for_write = storage_module._open_for_write
+        monkeypatch.setattr(
+            storage_module,
+            "_open_for_write",
+            lambda path: opened.append(path) or open_for_write(path),
+        )
+
+        again = await storage.store_file_streaming(io.BytesIO(data), "a.jpg")
+
+        assert again.is_duplicate is True
+        assert again.file_id == first.file_id
+        assert opened == []
+
+    async def test_shared_prefix_different_file(self, storage):
+        """Test that a prefix hit on different content still stores the new file."""
+        head = os.urandom(storage_module.DEDUP_PREFIX_SIZE)
+        first = await storage.store_file_streaming(io.BytesIO(head + b"one"), "c.jpg")
+
+        second = await storage.store_file_streaming(io.BytesIO(head + b"two"), "c.jpg")
+
+        assert second.is_duplicate is False
+        assert second.file_id == hashlib.sha256(head + b"two").hexdigest()
+        assert (storage.upload_dir / second.storage_path).read_bytes() == head + b"two"
+        assert (storage.upload_dir / first.storage_path).read_bytes() == head + b"one"
+        assert not list(storage.upload_dir.glob("temp_*"))
+
+    async def test_hint_for_deleted_original_restores_it(self, storage, monkeypatch):
+        """Test a content hint whose original vanishes after the check."""
+        data = _jpeg_bytes()
+        first = await storage.store_file_streaming(io.BytesIO(data), "a.jpg")
+        original = storage.upload_dir / first.storage_path
+        original.unlink()
+        # The hint check passed just before a concurrent delete
+        monkeypatch.setattr(storage, "_matches_stored", lambda *args: True)
+
+        stored = await storage.store_file_streaming(
+            io.BytesIO(data), "a.jpg", content_sha256=first.file_id
+        )
+
+        assert stored.is_duplicate is False
+        assert stored.file_id == hashlib.sha256(data).hexdigest()
+        assert original.read_bytes() == data
+
+    async def test_prefix_skip_for_deleted_original_restreams(
+        self, storage, monkeypatch
+    ):
+        """Test a prefix hit whose original vanishes before finalizing."""
+        data = _jpeg_bytes()
+        first = await storage.store_file_streaming(io.BytesIO(data), "b.jpg")
+        original = storage.upload_dir / first.storage_path
+        original.unlink()
+        # The prefix lookup still believes the original is there
+        monkeypatch.setattr(storage, "_is_stored", lambda *args: True)
+
+        stored = await storage.store_file_streaming(io.BytesIO(data), "b.jpg")
+
+        assert stored.is_duplicate is False
+        assert original.read_bytes() == data
+        assert not list(storage.upload_dir.glob("temp_*"))
+
+
+class TestContentHints:
+    """Tests for the X-Content-SHA256 upload hint and stored CRC32s."""
+
+    async def test_image_crc32_is_recorded(self, storage):
+        """Test that the CRC32 used for ZIP downloads is computed at ingest."""
+        data = _jpeg_bytes()
+
+        stored = await storage.store_file_streaming(io.BytesIO(data), "a.jpg")
+
+        assert stored.crc32 == zlib.crc32(data)
+
+    async def test_matching_hint_skips_reading(self, storage):
+        """Test that a hint naming a stored file of the same size short-circuits."""
+        data = _jpeg_bytes()
+        first = await storage.store_file_streaming(io.BytesIO(data), "a.jpg")
+        upload = io.BytesIO(data)
+
+        stored = await storage.store_file_streaming(
+            upload, "a.jpg", content_sha256=first.file_id.upper()
+        )
+
+        assert stored.is_duplicate is True
+        assert stored.file_id == first.file_id
+        assert stored.file_size == len(data)
+        assert upload.tell() == 0
+
+    @pytest.mark.parametrize("hint", ["not-a-hash", "0" * 64, "size-mismatch"])
+    async def test_unusable_hint_falls_back_to_hashing(self, storage, hint):
+        """Test that malformed, unknown or wrong-size hints are ignored."""
+        data = _jpeg_bytes()
+        first = await storage.store_file_streaming(io.BytesIO(data), "a.jpg")
+        if hint == "size-mismatch":
+            hint = first.file_id
+        other = _jpeg_bytes((32, 32))
+
+        stored = await storage.store_file_streaming(
+            io.BytesIO(other), "a.jpg", content_sha256=hint
+        )
+
+        assert stored.is_duplicate is False
+        assert stored.file_id == hashlib.sha256(other).hexdigest()
+        assert stored.crc32 == zlib.crc32(other)
+
+
+class TestVideoStorage:
+    """Tests for streaming videos straight into storage."""
+
+    async def test_disk_backed_source(self, storage, tmp_path):
+        """Test a real file source, copied in the kernel where supported."""
+        data = os.urandom(300_000)
+        source = tmp_path / "source.mov"
+        source.write_bytes(data)
+
+        with open(source, "rb") as f:
+            stored = await storage.store_file_streaming(f, "clip.mov")
+            assert f.tell() == len(data)
+
+        assert stored.is_video is True
+        assert stored.file_size == len(data)
+        assert (storage.upload_dir / stored.storage_path).read_bytes() == data
+
+    async def test_in_memory_source_batched(self, storage, monkeypatch):
+        """Test a memory source written in several writev() batches."""
+        monkeypatch.setattr(storage_module, "CHUNK_SIZE", 64 * 1024)
+        monkeypatch.setattr(storage_module, "VIDEO_WRITE_BATCH_SIZE", 200 * 1024)
+        data = os.urandom(1_000_003)
+
+        stored = await storage.store_file_streaming(io.BytesIO(data), "clip.mp4")
+
+        assert stored.file_size == len(data)
+        assert stored.crc32 == zlib.crc32(data)
+        assert (storage.upload_dir / stored.storage_path).read_bytes() == data
+
+
+class TestLazyThumbnails:
+    """Tests for generating missing variants on first request."""
+
+    @pytest.fixture
+    def files(self, storage, monkeypatch):
+        """Point the file-serving API at the temp storage."""
+        monkeypatch.setattr(files_api, "UPLOAD_DIR", storage.upload_dir)
+        monkeypatch.setattr(files_api, "storage_service", storage)
+        return storage
+
+    def _place_original(self, storage, data: bytes) -> str:
+        """Put an original in storage without generating any variants."""
+        file_id = hashlib.sha256(data).hexdigest()
+        path = storage.get_file_path(file_id, ".jpg")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return file_id
+
+    async def test_missing_variants_are_generated(self, files, monkeypatch):
+        """Test that concurrent requests share one generation job."""
+        file_id = self._place_original(files, _jpeg_bytes((3000, 2000)))
+        runs = []
+        generate = StorageService._generate_thumbnails
+
+        async def counting_generate(self, *args):
+            runs.append(args)
+            await generate(self, *args)
+
+        # Patched on the class: the instance is pickled into the image pool
+        monkeypatch.setattr(StorageService, "_generate_thumbnails", counting_generate)
+
+        web, thumb = await asyncio.gather(
+            files_api.resolve_file_path(file_id, "web", ".jpg"),
+            files_api.resolve_file_path(file_id, "thumbnail", ".jpg"),
+        )
+
+        assert len(runs) == 1
+        assert web == files.get_file_path(file_id, ".jpg", files.VARIANT_WEB)
+        assert thumb == files.get_file_path(file_id, ".jpg", files.VARIANT_THUMBNAIL)
+        with Image.open(web) as img:
+            assert img.size == (2400, 1600)
+        with Image.open(thumb) as img:
+            assert max(img.size) == 800
+
+    async def test_in_flight_job_is_awaited(self, files):
+        """Test that a variant on disk isn't served while its job still runs."""
+        file_id = self._place_original(files, _jpeg_bytes())
+        web_path = files.get_file_path(file_id, ".jpg", files.VARIANT_WEB)
+        web_path.parent.mkdir(parents=True, exist_ok=True)
+        web_path.write_bytes(b"RIFF")  # Left over from an interrupted write
+        job = files._schedule_image_thumbnails(
+            files.get_file_path(file_id, ".jpg"), file_id, ".jpg"
+        )
+
+        path = await files_api.resolve_file_path(file_id, "web", ".jpg")
+
+        assert job.done()
+        assert path == web_path
+        with Image.open(path) as img:
+            assert img.format == "WEBP"
+        assert not list(web_path.parent.glob("temp_*"))
+
+    async def test_broken_pool_is_replaced(self, files, monkeypatch):
+        """Test that a pool broken by a dead worker is swapped out and retried."""
+        file_id = self._place_original(files, _jpeg_bytes())
+        broken = _BrokenPool()
+        monkeypatch.setattr(storage_module, "_image_pool", broken)
+
+        try:
+            assert await files.ensure_thumbnails(file_id, ".jpg") is True
+            assert broken.shut_down is True
+            assert storage_module._image_pool not in (None, broken)
+        finally:
+            storage_module.shutdown_image_pool()
+
+    async def test_undecodable_original_is_served_instead(self, files):
+        """Test the fallback to the original when variants can't be made."""
+        file_id = self._place_original(files, b"not an image" * 100)
+
+        path = await files_api.resolve_file_path(file_id, "web", ".jpg")
+
+        assert path == files.get_file_path(file_id, ".jpg")
+
+    async def test_missing_original_is_404(self, files):
+        """Test that a hash with no stored original is a 404."""
+        with pytest.raises(HTTPException) as exc_info:
+            await files_api.resolve_file_path("ab" * 32, "thumbnail", ".jpg")
+
+        assert exc_info.value.status_code == 404
@@ -0,0 +1,73 @@
+"""Tests for upload endpoints."""
+
+import hashlib
+import io
+
+import pytest
+from httpx import AsyncClient
+from PIL import Image
+
+from api.uploads import uploads_api
+from services.storage_service import StorageService
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch) -> StorageService:
+    """Point the upload API at a fresh temp storage directory."""
+    service = StorageService(tmp_path)
+    service.ensure_directories()
+    monkeypatch.setattr(uploads_api, "storage_service", service)
+    return service
+
+
+def _jpeg_bytes() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), (120, 30, 200)).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_upload_with_content_sha256_header(
+    client: AsyncClient, storage: StorageService, monkeypatch
+):
+    """Test that X-Content-SHA256 reaches storage and skips a known image."""
+    data = _jpeg_bytes()
+    sha256 = hashlib.sha256(data).hexdigest()
+    first = await client.post("/api/upload", files={"file": ("a.jpg", data)})
+    hints = []
+    store = storage.store_file_streaming
+
+    async def recording_store(*args, content_sha256=None, **kwargs):
+        hints.append(content_sha256)
+        return await store(*args, content_sha256=content_sha256, **kwargs)
+
+    monkeypatch.setattr(storage, "store_file_streaming", recording_store)
+
+    response = await client.post(
+        "/api/upload",
+        files={"file": ("a.jpg", data)},
+        headers={"X-Content-SHA256": sha256.upper()},
+    )
+
+    assert first.status_code == 200
+    assert response.status_code == 200
+    assert hints == [sha256.upper()]
+    assert response.json()["file_id"] == sha256
+    assert response.json()["is_duplicate"] is True
+
+
+@pytest.mark.asyncio
+async def test_content_sha256_header_allowed_by_cors(client: AsyncClient):
+    """Test that browsers may send X-Content-SHA256 cross-origin."""
+    response = await client.options(
+        "/api/upload",
+        headers={
+            "Origin": "http://localhost",
+            "Access-Control-Request-Method": "POST",
+            "Access-Control-Request-Headers": "x-content-sha256",
+        },
+    )
+
+    assert response.status_code == 200
+    allowed = response.headers["access-control-allow-headers"].lower()
+    assert "x-content-sha256" in allowed
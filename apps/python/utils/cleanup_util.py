@@ -1,9 +1,7 @@
 """Utilities for cleaning up temporary files."""
 
 import asyncio
-import glob
 import os
-import shutil
 import time
 from pathlib import Path
 
@@ -11,68 +9,90 @@ from pathlib import Path
 _cleanup_task: asyncio.Task | None = None
 
 
+def _remove_tree(path: str) -> int:
+    """
+    Delete a directory tree and return the total size of the files removed.
+
+    Sizes come from the same scandir pass that does the unlinking, so the
+    tree is walked once instead of once to measure and again to rmtree.
+    """
+    total = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                total += _remove_tree(entry.path)
+            else:
+                total += entry.stat(follow_symlinks=False).st_size
+                os.unlink(entry.path)
+    os.rmdir(path)
+    return total
+
+
+def _remove_old_files(directory: str, prefix: str, cutoff: float) -> tuple[int, int]:
+    """Unlink files in a directory matching prefix with mtime before cutoff."""
+    cleaned_count = 0
+    cleaned_size = 0
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return 0, 0
+
+    with entries:
+        for entry in entries:
+            name = entry.name
+            # Match glob semantics: "*" never matches a leading dot
+            if name.startswith(".") or not name.startswith(prefix):
+                continue
+            try:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                st = entry.stat(follow_symlinks=False)
+                if st.st_mtime < cutoff:
+                    os.unlink(entry.path)
+                    cleaned_count += 1
+                    cleaned_size += st.st_size
+            except OSError:
+                pass
+
+    return cleaned_count, cleaned_size
+
+
 def cleanup_old_temp_files(upload_dir: Path) -> tuple[int, int]:
     """
     Remove temporary files past their age threshold.
 
     Cleans:
-    - ZIP files in /tmp from album downloads (1 hour)
     - temp_* files in upload directory from interrupted uploads (1 hour)
     - Abandoned chunked upload directories in uploads/chunks/ (24 hours)
 
     Returns:
         Tuple of (files_cleaned, bytes_cleaned)
     """
-    cleaned_count = 0
-    cleaned_size = 0
+    upload_root = os.fspath(upload_dir)
     one_hour_ago = time.time() - 3600  # 1 hour
     one_day_ago = time.time() - 86400  # 24 hours
 
-    # Clean ZIP files in /tmp
-    for pattern in ["/tmp/*.zip", "/tmp/tmp*.zip"]:
-        for filepath in glob.glob(pattern):
-            try:
-                if os.path.getmtime(filepath) < one_hour_ago:
-                    size = os.path.getsize(filepath)
-                    os.unlink(filepath)
-                    cleaned_count += 1
-                    cleaned_size += size
-            except (OSError, FileNotFoundError):
-                pass
-
     # Clean temp upload files (temp_* in upload root)
-    temp_pattern = str(upload_dir / "temp_*")
-    for filepath in glob.glob(temp_pattern):
-        try:
-            if os.path.getmtime(filepath) < one_hour_ago:
-                size = os.path.getsize(filepath)
-                os.unlink(filepath)
-                cleaned_count += 1
-                cleaned_size += size
-        except (OSError, FileNotFoundError):
-            pass
+    cleaned_count, cleaned_size = _remove_old_files(upload_root, "temp_", one_hour_ago)
 
     # Clean abandoned chunked upload directories (24 hour threshold)
-    chunks_dir = upload_dir / "chunks"
-    if chunks_dir.exists():
-        for upload_session_dir in chunks_dir.iterdir():
-            if not upload_session_dir.is_dir():
-                continue
-            try:
-                # Check the directory modification time
-                dir_mtime = os.path.getmtime(upload_session_dir)
-                if dir_mtime < one_day_ago:
-                    # Calculate total size of the directory
-                    dir_size = sum(
-                        f.stat().st_size
-                        for f in upload_session_dir.rglob("*")
-                        if f.is_file()
-                    )
-                    shutil.rmtree(upload_session_dir)
-                    cleaned_count += 1
-                    cleaned_size += dir_size
-            except (OSError, FileNotFoundError):
-                pass
+    try:
+        chunk_sessions = os.scandir(os.path.join(upload_root, "chunks"))
+    except OSError:
+        chunk_sessions = None
+
+    if chunk_sessions is not None:
+        with chunk_sessions:
+            for entry in chunk_sessions:
+                try:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                    # Check the directory modification time
+                    if entry.stat(follow_symlinks=False).st_mtime < one_day_ago:
+                        cleaned_size += _remove_tree(entry.path)
+                        cleaned_count += 1
+                except OSError:
+                    pass
 
     if cleaned_count > 0:
         print(
@@ -92,7 +112,7 @@ async def periodic_cleanup(upload_dir: Path, interval_seconds: int = 1800):
     """
     while True:
         await asyncio.sleep(interval_seconds)
-        cleanup_old_temp_files(upload_dir)
+        await asyncio.to_thread(cleanup_old_temp_files, upload_dir)
 
 
 def start_cleanup_task(upload_dir: Path) -> asyncio.Task:
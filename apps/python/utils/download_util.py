@@ -1,131 +1,365 @@
 """Utilities for file downloads with resumable support."""
 
+import hashlib
+import json
 import os
-import tempfile
-import zipfile
+import re
+import struct
+import time
+import zlib
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Sequence
 
-from fastapi import BackgroundTasks, HTTPException, Request
+import anyio
+from fastapi import HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.responses import Response
 
+# Chunk size for pread() when the server doesn't offer zero-copy sends
+CHUNK_SIZE = 1024 * 1024
+
+# Single byte range: bytes=start-end, bytes=start- or bytes=-suffix
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
+# ZIP (STORED) record layouts, as in zipfile
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+_END_RECORD64 = struct.Struct("<4sQ2H2L4Q")
+_END_LOCATOR64 = struct.Struct("<4sLQL")
+_ZIP64_LIMIT = 0xFFFFFFFF  # Sizes/offsets from here on need ZIP64 records
+_ZIP64_MARKER = 0xFFFFFFFF  # 32-bit field value meaning "see ZIP64 extra"
+_ZIP_VERSION = 20
+_ZIP64_VERSION = 45
+_UTF8_FLAG = 0x800
+
+
+@dataclass
+class ZipEntry:
+    """A stored file to include in a streamed ZIP archive."""
+
+    path: str
+    name: str
+    size: int
+    crc32: int
+    mtime: float
+
+
+def _file_crc32(path: str) -> int:
+    """CRC32 of a file on disk (for rows stored before CRC32 was tracked)."""
+    crc = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _dos_datetime(mtime: float) -> tuple[int, int]:
+    """ZIP (MS-DOS) date and time fields for a timestamp."""
+    year, month, day, hour, minute, second = time.localtime(mtime)[:6]
+    if year < 1980:
+        year, month, day, hour, minute, second = 1980, 1, 1, 0, 0, 0
+    return (
+        (year - 1980) << 9 | month << 5 | day,
+        hour << 11 | minute << 5 | second // 2,
+    )
+
+
+def _zip_layout(entries: Sequence[ZipEntry]) -> tuple[list, int]:
+    """
+    Lay out a STORED ZIP archive without reading any file contents.
+
+    Returns:
+        Tuple of (segments, total_size); each segment is
+        (offset, bytes or file path, length)
+    """
+    segments: list[tuple[int, bytes | str, int]] = []
+    central: list[bytes] = []
+    offset = 0
+
+    for entry in entries:
+        name = entry.name.encode("utf-8")
+        flags = _UTF8_FLAG if not entry.name.isascii() else 0
+        date, dos_time = _dos_datetime(entry.mtime)
+        zip64_size = entry.size >= _ZIP64_LIMIT
+        zip64_offset = offset >= _ZIP64_LIMIT
+        version = _ZIP64_VERSION if zip64_size or zip64_offset else _ZIP_VERSION
+        size32 = _ZIP64_MARKER if zip64_size else entry.size
+
+        local_extra = b""
+        if zip64_size:
+            local_extra = struct.pack("<2H2Q", 1, 16, entry.size, entry.size)
+        header = (
+            _LOCAL_HEADER.pack(
+                b"PK\x03\x04",
+                version,
+                0,
+                flags,
+                0,
+                dos_time,
+                date,
+                entry.crc32,
+                size32,
+                size32,
+                len(name),
+                len(local_extra),
+            )
+            + name
+            + local_extra
+        )
+        segments.append((offset, header, len(header)))
+        segments.append((offset + len(header), entry.path, entry.size))
+
+        central_fields = []
+        if zip64_size:
+            central_fields += [entry.size, entry.size]
+        if zip64_offset:
+            central_fields.append(offset)
+        central_extra = b""
+        if central_fields:
+            central_extra = struct.pack(
+                f"<2H{len(central_fields)}Q",
+                1,
+                8 * len(central_fields),
+                *central_fields,
+            )
+        central.append(
+            _CENTRAL_HEADER.pack(
+                b"PK\x01\x02",
+                version,
+                3,  # Made on Unix
+                version,
+                0,
+                flags,
+                0,
+                dos_time,
+                date,
+                entry.crc32,
+                size32,
+                size32,
+                len(name),
+                len(central_extra),
+                0,
+                0,
+                0,
+                0o100644 << 16,
+                _ZIP64_MARKER if zip64_offset else offset,
+            )
+            + name
+            + central_extra
+        )
+        offset += len(header) + entry.size
+
+    directory = b"".join(central)
+    count = len(entries)
+    directory_offset = offset
+    end = b""
+    if (
+        count >= 0xFFFF
+        or directory_offset >= _ZIP64_LIMIT
+        or len(directory) >= _ZIP64_LIMIT
+    ):
+        end_offset = directory_offset + len(directory)
+        end = _END_RECORD64.pack(
+            b"PK\x06\x06",
+            _END_RECORD64.size - 12,
+            _ZIP64_VERSION,
+            _ZIP64_VERSION,
+            0,
+            0,
+            count,
+            count,
+            len(directory),
+            directory_offset,
+        ) + _END_LOCATOR64.pack(b"PK\x06\x07", 0, end_offset, 1)
+    end += _END_RECORD.pack(
+        b"PK\x05\x06",
+        0,
+        0,
+        min(count, 0xFFFF),
+        min(count, 0xFFFF),
+        min(len(directory), _ZIP64_MARKER),
+        min(directory_offset, _ZIP64_MARKER),
+        0,
+    )
+    trailer = directory + end
+    segments.append((offset, trailer, len(trailer)))
+    return segments, offset + len(trailer)
+
+
+def _zip_etag(entries: Sequence[ZipEntry]) -> str:
+    """Strong ETag for an archive, from everything that determines its bytes."""
+    digest = hashlib.sha256()
+    for entry in entries:
+        fields = [entry.name, entry.size, entry.crc32, entry.mtime]
+        digest.update(json.dumps(fields).encode() + b"\n")
+    return f'"{digest.hexdigest()[:32]}"'
+
 
-async def cleanup_temp_file(path: str) -> None:
-    """Background task to clean up temporary files."""
+def _pread_range(path: str, offset: int, count: int) -> bytes:
+    """Read one byte range of a file with a single open/pread/close."""
+    fd = os.open(path, os.O_RDONLY)
     try:
-        os.unlink(path)
-    except Exception:
-        pass
+        return os.pread(fd, count, offset)
+    finally:
+        os.close(fd)
 
 
-def create_photos_zip(
+async def _send_file_range(
+    scope, send, f, offset: int, count: int, more_body: bool
+) -> int:
+    """
+    Send count bytes of an open file as response body.
+
+    Uses the server's zero-copy extension when offered, otherwise pread()
+    chunks. Returns the number of bytes that could not be sent (short file).
+    """
+    if "http.response.zerocopysend" in scope.get("extensions", {}):
+        # Server copies the range with sendfile(), bypassing userspace
+        await send(
+            {
+                "type": "http.response.zerocopysend",
+                "file": f,
+                "offset": offset,
+                "count": count,
+                "more_body": more_body,
+            }
+        )
+        return 0
+
+    fd = f.fileno()
+    remaining = count
+    # One message dict for the whole range: servers consume each message
+    # before send() returns, so only the body fields need updating
+    message = {"type": "http.response.body", "body": b"", "more_body": True}
+    while remaining > 0:
+        chunk_size = min(CHUNK_SIZE, remaining)
+        # Positioned read (no seek) in a worker thread, off the loop
+        chunk = await anyio.to_thread.run_sync(os.pread, fd, chunk_size, offset)
+        if not chunk:
+            break
+        offset += len(chunk)
+        remaining -= len(chunk)
+
+        message["body"] = chunk
+        message["more_body"] = more_body or remaining > 0
+        await send(message)
+    return remaining
+
+
+async def create_photos_zip(
     photos: Sequence,
     album_title: str,
     upload_dir: Path,
     request: Request,
-    background_tasks: BackgroundTasks,
-) -> "ResumableFileResponse":
+    db: AsyncSession,
+) -> "StreamingZipResponse":
     """
-    Create a ZIP file from photos and return a resumable file response.
+    Build a streamed ZIP download of photos.
+
+    Nothing is copied to disk: the archive is laid out from file sizes and
+    stored CRC32s, and file bodies are sent straight from storage.
 
     Args:
         photos: Sequence of Photo objects with file_hash relationship loaded
         album_title: Title of the album (used for ZIP filename)
         upload_dir: Base directory where files are stored
-        request: FastAPI request object (for ResumableFileResponse)
-        background_tasks: FastAPI background tasks (for cleanup)
+        request: FastAPI request object (for Range support)
+        db: Session used to persist CRC32s computed for older files
 
     Returns:
-        ResumableFileResponse for streaming the ZIP file
+        StreamingZipResponse for the archive
     """
-    # Collect file paths and names
-    files_to_zip: list[tuple[Path, str]] = []
+    entries: list[ZipEntry] = []
     used_names: dict[str, int] = {}
+    filled_crc = False
+    upload_root = os.fspath(upload_dir)
 
     for photo in photos:
         file_hash = photo.file_hash
         if not file_hash:
             continue
 
-        file_path = upload_dir / file_hash.storage_path
-
-        if file_path.exists():
-            # Handle duplicate filenames
-            base_name = photo.original_filename
-            if base_name in used_names:
-                used_names[base_name] += 1
-                name_parts = base_name.rsplit(".", 1)
-                if len(name_parts) == 2:
-                    archive_name = (
-                        f"{name_parts[0]}_{used_names[base_name]}.{name_parts[1]}"
-                    )
-                else:
-                    archive_name = f"{base_name}_{used_names[base_name]}"
-            else:
-                used_names[base_name] = 0
-                archive_name = base_name
+        file_path = f"{upload_root}/{file_hash.storage_path}"
 
-            files_to_zip.append((file_path, archive_name))
+        try:
+            stat_result = os.stat(file_path)
+        except FileNotFoundError:
+            continue
 
-    if not files_to_zip:
-        raise HTTPException(status_code=404, detail="No files available for download")
+        # Handle duplicate filenames
+        base_name = photo.original_filename
+        if base_name in used_names:
+            used_names[base_name] += 1
+            name_parts = base_name.rsplit(".", 1)
+            if len(name_parts) == 2:
+                archive_name = (
+                    f"{name_parts[0]}_{used_names[base_name]}.{name_parts[1]}"
+                )
+            else:
+                archive_name = f"{base_name}_{used_names[base_name]}"
+        else:
+            used_names[base_name] = 0
+            archive_name = base_name
+
+        if file_hash.crc32 is None:
+            # Stored before CRC32 was tracked: compute once and keep it
+            file_hash.crc32 = await anyio.to_thread.run_sync(_file_crc32, file_path)
+            filled_crc = True
+
+        entries.append(
+            ZipEntry(
+                path=file_path,
+                name=archive_name,
+                size=stat_result.st_size,
+                crc32=file_hash.crc32,
+                mtime=stat_result.st_mtime,
+            )
+        )
 
-    # Create ZIP file on disk (temporary file) - ZIP_STORED for speed (no compression)
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".zip")
-    temp_path = temp_file.name
-    temp_file.close()
+    if not entries:
+        raise HTTPException(status_code=404, detail="No files available for download")
 
-    try:
-        with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_STORED) as zip_file:
-            for file_path, archive_name in files_to_zip:
-                zip_file.write(file_path, archive_name)
-    except Exception as e:
-        os.unlink(temp_path)
-        raise HTTPException(status_code=500, detail=f"Failed to create ZIP: {str(e)}")
+    if filled_crc:
+        await db.commit()
 
     # Create safe filename for the ZIP
     safe_title = "".join(c if c.isalnum() or c in " -_" else "_" for c in album_title)
     zip_filename = f"{safe_title}.zip"
 
-    # Schedule cleanup after response is sent
-    background_tasks.add_task(cleanup_temp_file, temp_path)
-
-    return ResumableFileResponse(
-        path=temp_path,
+    return StreamingZipResponse(
+        entries=entries,
         filename=zip_filename,
-        media_type="application/zip",
         request=request,
     )
 
 
-class ResumableFileResponse(Response):
+class RangeResponse(Response):
     """
-    A FileResponse that supports HTTP Range requests for resumable downloads.
+    Base for downloads that support HTTP Range requests.
 
     This is critical for mobile users where connections may drop.
     Supports:
     - Range header for partial content (206 response)
     - Accept-Ranges header to advertise support
     - Content-Range header in responses
+    - ETag/If-Range, so a resume never splices two different versions
     """
 
-    chunk_size = 64 * 1024  # 64KB chunks
-
     def __init__(
         self,
-        path: str | Path,
+        file_size: int,
         filename: str,
         media_type: str,
         request: Request,
+        etag: str | None = None,
     ):
-        self.path = Path(path)
         self.filename = filename
         self._media_type = media_type
         self.request = request
-
-        # Get file info
-        self.stat_result = os.stat(self.path)
-        self.file_size = self.stat_result.st_size
+        self.file_size = file_size
+        self.etag = etag
 
         # Parse Range header
         self.start = 0
@@ -133,7 +367,11 @@ class ResumableFileResponse(Response):
         self.status_code = 200
 
         range_header = request.headers.get("range")
-        if range_header:
+        if_range = request.headers.get("if-range")
+        # If-Range needs a strong match; otherwise the client's partial copy
+        # is stale and gets the full body instead
+        range_applies = if_range is None or (etag is not None and if_range == etag)
+        if range_header and range_applies:
             self._parse_range(range_header)
 
         # Calculate content length
@@ -146,6 +384,8 @@ class ResumableFileResponse(Response):
             "content-disposition": f'attachment; filename="{self.filename}"',
         }
 
+        if etag is not None:
+            headers["etag"] = etag
         if self.status_code == 206:
             headers["content-range"] = f"bytes {self.start}-{self.end}/{self.file_size}"
 
@@ -158,43 +398,32 @@ class ResumableFileResponse(Response):
 
     def _parse_range(self, range_header: str) -> None:
         """Parse the Range header and set start/end positions."""
-        try:
-            # Format: bytes=start-end or bytes=start- or bytes=-suffix
-            if not range_header.startswith("bytes="):
-                return
-
-            range_spec = range_header[6:]  # Remove "bytes="
-
-            if range_spec.startswith("-"):
-                # Suffix range: last N bytes
-                suffix_length = int(range_spec[1:])
-                self.start = max(0, self.file_size - suffix_length)
-                self.end = self.file_size - 1
-            elif range_spec.endswith("-"):
-                # Open-ended range: from start to end of file
-                self.start = int(range_spec[:-1])
-                self.end = self.file_size - 1
-            else:
-                # Explicit range: start-end
-                parts = range_spec.split("-")
-                self.start = int(parts[0])
-                self.end = min(int(parts[1]), self.file_size - 1)
-
-            # Validate range
-            if self.start >= self.file_size or self.start > self.end:
-                # Invalid range - return full file
-                self.start = 0
-                self.end = self.file_size - 1
-                return
-
-            self.status_code = 206
-
-        except (ValueError, IndexError):
-            # Invalid range header - return full file
-            pass
-
-    async def __call__(self, scope, receive, send) -> None:
-        """Stream the file content."""
+        match = _RANGE_RE.fullmatch(range_header)
+        if not match:
+            # Invalid or multi-range header - return full file
+            return
+
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            # Open-ended ranges run to the end of the file
+            end = min(int(last), self.file_size - 1) if last else self.file_size - 1
+        elif last:
+            # Suffix range: last N bytes
+            start = max(0, self.file_size - int(last))
+            end = self.file_size - 1
+        else:
+            return
+
+        # Invalid range - return full file
+        if start >= self.file_size or start > end:
+            return
+
+        self.start = start
+        self.end = end
+        self.status_code = 206
+
+    async def _send_start(self, send) -> None:
         await send(
             {
                 "type": "http.response.start",
@@ -203,24 +432,40 @@ class ResumableFileResponse(Response):
             }
         )
 
-        with open(self.path, "rb") as f:
-            f.seek(self.start)
-            remaining = self.content_length
 
-            while remaining > 0:
-                chunk_size = min(self.chunk_size, remaining)
-                chunk = f.read(chunk_size)
-                if not chunk:
-                    break
-                remaining -= len(chunk)
+class ResumableFileResponse(RangeResponse):
+    """A FileResponse that supports HTTP Range requests for resumable downloads."""
 
-                await send(
-                    {
-                        "type": "http.response.body",
-                        "body": chunk,
-                        "more_body": remaining > 0,
-                    }
-                )
+    def __init__(
+        self,
+        path: str | Path,
+        filename: str,
+        media_type: str,
+        request: Request,
+    ):
+        self.path = os.fspath(path)
+
+        # Get file info
+        self.stat_result = os.stat(self.path)
+        super().__init__(self.stat_result.st_size, filename, media_type, request)
+
+    async def __call__(self, scope, receive, send) -> None:
+        """Stream the file content."""
+        await self._send_start(send)
+
+        if self.content_length <= CHUNK_SIZE:
+            # Small ranges (resume probes, short files): one thread hop for
+            # open+pread and a single final body frame
+            body = await anyio.to_thread.run_sync(
+                _pread_range, self.path, self.start, self.content_length
+            )
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+            return
+
+        with open(self.path, "rb") as f:
+            remaining = await _send_file_range(
+                scope, send, f, self.start, self.content_length, more_body=False
+            )
 
         if remaining > 0:
             await send(
@@ -230,3 +475,67 @@ class ResumableFileResponse(Response):
                     "more_body": False,
                 }
             )
+
+
+class StreamingZipResponse(RangeResponse):
+    """
+    A STORED ZIP archive streamed from files in place, with Range support.
+
+    Headers and the central directory are precomputed from each entry's size
+    and CRC32, so the archive's byte layout is known up front and any range
+    maps onto header bytes and file slices. The ETag is derived from the same
+    entry fields, so it changes whenever the archive bytes could.
+    """
+
+    def __init__(
+        self,
+        entries: Sequence[ZipEntry],
+        filename: str,
+        request: Request,
+    ):
+        self.segments, archive_size = _zip_layout(entries)
+        super().__init__(
+            archive_size,
+            filename,
+            "application/zip",
+            request,
+            etag=_zip_etag(entries),
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        """Stream the parts of the archive that overlap the requested range."""
+        await self._send_start(send)
+
+        end = self.start + self.content_length
+        for offset, part, length in self.segments:
+            part_end = offset + length
+            if part_end <= self.start or offset >= end:
+                continue
+            lo = max(self.start, offset) - offset
+            hi = min(end, part_end) - offset
+            more_body = part_end < end
+
+            if isinstance(part, bytes):
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": part[lo:hi],
+                        "more_body": more_body,
+                    }
+                )
+                continue
+
+            with open(part, "rb") as f:
+                remaining = await _send_file_range(
+                    scope, send, f, lo, hi - lo, more_body
+                )
+            if remaining > 0:
+                # File shrank since the layout was computed: end the body
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": b"",
+                        "more_body": False,
+                    }
+                )
+                return
@@ -1,15 +1,24 @@
 """JWT token utilities for admin authentication."""
 
+import contextlib
+import errno
+import functools
 import os
 import secrets
+import tempfile
+import time
 import uuid
-from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 import jwt
 from core.config import UPLOAD_DIR
 
 
+# What link() fails with on filesystems that don't support hard links
+_NO_HARDLINK_ERRNOS = {errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOSYS}
+
+
+@functools.cache
 def _get_or_create_jwt_secret(upload_dir: Path) -> str:
     """
     Get JWT secret from environment, or auto-generate and persist one.
@@ -26,6 +35,10 @@ def _get_or_create_jwt_secret(upload_dir: Path) -> str:
     secret_file = upload_dir / ".jwt_secret"
 
     if secret_file.exists():
+        # Tighten files left behind by older versions, which wrote with the
+        # default umask. A read-only volume can still be read, so carry on.
+        with contextlib.suppress(OSError):
+            os.chmod(secret_file, 0o600)
         return secret_file.read_text().strip()
 
     # Generate new secret and persist it
@@ -33,7 +46,30 @@ def _get_or_create_jwt_secret(upload_dir: Path) -> str:
     new_secret = secrets.token_hex(32)  # 64 characters, cryptographically secure
 
     upload_dir.mkdir(parents=True, exist_ok=True)
-    secret_file.write_text(new_secret)
+
+    # Write the full secret to a private temp file, then link it into place.
+    # link() fails if the file already exists, so when several workers boot
+    # at once exactly one secret wins and the others read it back.
+    fd, temp_path = tempfile.mkstemp(dir=upload_dir, prefix=".jwt_secret.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(new_secret)
+        os.link(temp_path, secret_file)
+    except FileExistsError:
+        return secret_file.read_text().strip()
+    except OSError as e:
+        if e.errno not in _NO_HARDLINK_ERRNOS:
+            raise
+        # No hard links on this filesystem (some Docker volumes, SMB, FAT):
+        # fall back to an exclusive create, which still lets only one win
+        try:
+            fd = os.open(secret_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+        except FileExistsError:
+            return secret_file.read_text().strip()
+        with os.fdopen(fd, "w") as f:
+            f.write(new_secret)
+    finally:
+        os.unlink(temp_path)
 
     print(f"Generated new JWT secret and saved to {secret_file}")
     return new_secret
@@ -52,23 +88,43 @@ def create_access_token(admin_id: uuid.UUID, email: str) -> tuple[str, int]:
     Returns:
         tuple: (token_string, expires_in_seconds)
     """
-    expires_delta = timedelta(hours=JWT_EXPIRATION_HOURS)
-    expire = datetime.now(timezone.utc) + expires_delta
+    expires_in = JWT_EXPIRATION_HOURS * 3600
+    # Integer epoch claims: PyJWT would otherwise convert datetimes itself
+    now = int(time.time())
 
     payload = {
         "sub": str(admin_id),
         "email": email,
-        "exp": expire,
-        "iat": datetime.now(timezone.utc),
+        "exp": now + expires_in,
+        "iat": now,
         "type": "access",
     }
 
     token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
-    expires_in = int(expires_delta.total_seconds())
 
     return token, expires_in
 
 
+@functools.lru_cache(maxsize=4096)
+def _decode_access_token(token: str) -> tuple[dict, float]:
+    """
+    Decode an access token once and remember the result.
+
+    Access tokens are presented on every authenticated request, so caching by
+    the raw token string skips the HMAC and JSON parse on repeat calls. Expiry
+    is returned separately so callers can re-check it without re-verifying.
+    Invalid tokens raise instead of returning, so only successful decodes are
+    cached and junk tokens can't evict real ones.
+    """
+    payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+
+    # Check token type
+    if payload.get("type") != "access":
+        raise jwt.InvalidTokenError("Not an access token")
+
+    return payload, payload.get("exp", float("inf"))
+
+
 def verify_access_token(token: str) -> dict | None:
     """
     Verify and decode a JWT access token.
@@ -77,17 +133,13 @@ def verify_access_token(token: str) -> dict | None:
         dict: Decoded payload if valid, None if invalid
     """
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-
-        # Check token type
-        if payload.get("type") != "access":
-            return None
-
-        return payload
-    except jwt.ExpiredSignatureError:
-        return None
+        payload, exp = _decode_access_token(token)
     except jwt.InvalidTokenError:
         return None
+    if exp <= time.time():
+        return None
+    # The cached payload is shared between requests, so hand out a copy
+    return dict(payload)
 
 
 def get_admin_id_from_token(token: str) -> uuid.UUID | None:
@@ -116,18 +168,17 @@ def create_refresh_token(admin_id: uuid.UUID) -> tuple[str, int]:
     Returns:
         tuple: (token_string, expires_in_seconds)
     """
-    expires_delta = timedelta(days=REFRESH_EXPIRATION_DAYS)
-    expire = datetime.now(timezone.utc) + expires_delta
+    expires_in = REFRESH_EXPIRATION_DAYS * 86400
+    now = int(time.time())
 
     payload = {
         "sub": str(admin_id),
-        "exp": expire,
-        "iat": datetime.now(timezone.utc),
+        "exp": now + expires_in,
+        "iat": now,
         "type": "refresh",
     }
 
     token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
-    expires_in = int(expires_delta.total_seconds())
 
     return token, expires_in
 
@@ -167,13 +218,12 @@ def create_temp_2fa_token(admin_id: uuid.UUID) -> str:
     Create a short-lived temporary token for 2FA verification.
     This token is issued after password verification but before 2FA is complete.
     """
-    expires_delta = timedelta(minutes=TEMP_2FA_EXPIRATION_MINUTES)
-    expire = datetime.now(timezone.utc) + expires_delta
+    now = int(time.time())
 
     payload = {
         "sub": str(admin_id),
-        "exp": expire,
-        "iat": datetime.now(timezone.utc),
+        "exp": now + TEMP_2FA_EXPIRATION_MINUTES * 60,
+        "iat": now,
         "type": "2fa_pending",
     }
 
@@ -1,15 +1,22 @@
 """Response building utilities."""
 
+import functools
+
 from models.api.albums_api_models import AlbumResponse, PhotoResponse
 from models.db.album_db_models import Album
 from models.db.photo_db_models import Photo
 
 
+@functools.lru_cache(maxsize=1 << 16)
+def _variant_paths_for_hash(sha256_hash: str) -> tuple[str, str]:
+    """Get the (thumbnail, web) paths for a file hash, memoized across listings."""
+    base = f"{sha256_hash[:2]}/{sha256_hash[2:4]}/{sha256_hash}.webp"
+    return f"thumbnails/{base}", f"web/{base}"
+
+
 def get_thumbnail_path_for_hash(sha256_hash: str) -> str:
     """Get the thumbnail path for a given file hash."""
-    shard1 = sha256_hash[:2]
-    shard2 = sha256_hash[2:4]
-    return f"thumbnails/{shard1}/{shard2}/{sha256_hash}.webp"
+    return _variant_paths_for_hash(sha256_hash)[0]
 
 
 def build_album_response(
@@ -50,9 +57,7 @@ def build_photo_response(photo: Photo) -> PhotoResponse:
     For videos, thumbnail/web paths point to the generated poster frame.
     """
     file_hash = photo.file_hash
-    shard1 = file_hash.sha256_hash[:2]
-    shard2 = file_hash.sha256_hash[2:4]
-    filename_base = file_hash.sha256_hash
+    thumbnail_path, web_path = _variant_paths_for_hash(file_hash.sha256_hash)
 
     return PhotoResponse(
         id=photo.id,
@@ -63,8 +68,8 @@ def build_photo_response(photo: Photo) -> PhotoResponse:
         captured_at=photo.captured_at,
         is_video=photo.is_video,
         storage_path=file_hash.storage_path,
-        thumbnail_path=f"thumbnails/{shard1}/{shard2}/{filename_base}.webp",
-        web_path=f"web/{shard1}/{shard2}/{filename_base}.webp",
+        thumbnail_path=thumbnail_path,
+        web_path=web_path,
         width=file_hash.width,
         height=file_hash.height,
         file_size=file_hash.file_size,
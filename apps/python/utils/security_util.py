@@ -1,28 +1,88 @@
 """Security utilities for authentication and token generation."""
 
+import asyncio
 import base64
-import io
+import hashlib
+import hmac
 import json
+import os
+import re
 import secrets
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
 import bcrypt
 import pyotp
-import qrcode
+import segno
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 
 
 def generate_token(length: int = 32) -> str:
     """Generate a secure random token for share links."""
+    # Straight from the kernel CSPRNG on purpose: one getrandom() per link is
+    # noise next to the DB write, and a userspace DRBG seeded at import would
+    # be duplicated into every forked worker
     return secrets.token_urlsafe(length)
 
 
+# Argon2id at the OWASP baseline (46 MiB, t=1, p=1): memory-hard, so cracking
+# is bound by RAM rather than raw GPU throughput
+_PASSWORD_HASHER = PasswordHasher(
+    time_cost=1,
+    memory_cost=46 * 1024,
+    parallelism=1,
+    hash_len=32,
+    salt_len=16,
+)
+
+# argon2 and bcrypt both release the GIL, so a thread pool sized to the CPU
+# count lets concurrent logins hash in parallel without blocking the event loop
+_HASH_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+
+def _is_bcrypt_hash(password_hash: str) -> bool:
+    return password_hash.startswith("$2")
+
+
 def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    """Hash a password using Argon2id."""
+    return _PASSWORD_HASHER.hash(password)
 
 
 def verify_password(password: str, password_hash: str) -> bool:
-    """Verify a password against a hash."""
-    return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+    """Verify a password against an Argon2id or legacy bcrypt hash."""
+    if _is_bcrypt_hash(password_hash):
+        return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+    try:
+        return _PASSWORD_HASHER.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def password_needs_rehash(password_hash: str) -> bool:
+    """Check whether a stored hash predates the current hashing parameters."""
+    if _is_bcrypt_hash(password_hash):
+        return True
+    try:
+        return _PASSWORD_HASHER.check_needs_rehash(password_hash)
+    except InvalidHashError:
+        return True
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password using Argon2id, off the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_HASH_POOL, hash_password, password)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    """Verify a password against a hash, off the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _HASH_POOL, verify_password, password, password_hash
+    )
 
 
 # ============================================================================
@@ -37,8 +97,14 @@ def generate_totp_secret() -> str:
 
 def get_totp_uri(secret: str, email: str, issuer: str = "ClientPix") -> str:
     """Generate the otpauth:// URI for authenticator app setup."""
-    totp = pyotp.TOTP(secret)
-    return totp.provisioning_uri(name=email, issuer_name=issuer)
+    return pyotp.TOTP(secret).provisioning_uri(name=email, issuer_name=issuer)
+
+
+# One pattern per code type, so a malformed code fails a single check whatever
+# is wrong with it. The shape only depends on what the caller sent, so bailing
+# out before any hashing tells them nothing they didn't already know
+_TOTP_SHAPE = re.compile(r"[0-9]{6}")
+_BACKUP_CODE_SHAPE = re.compile(r"[0-9A-F]{8}")
 
 
 def verify_totp_code(secret: str, code: str) -> bool:
@@ -46,27 +112,50 @@ def verify_totp_code(secret: str, code: str) -> bool:
     Verify a TOTP code against the secret.
     Allows for 1 time window before and after for clock drift tolerance.
     """
-    totp = pyotp.TOTP(secret)
-    return totp.verify(code, valid_window=1)
+    # Authenticator apps often display codes as "123 456"
+    code = code.strip().replace(" ", "")
+    if not _TOTP_SHAPE.fullmatch(code):
+        return False
+    return pyotp.TOTP(secret).verify(code, valid_window=1)
 
 
 def generate_backup_codes(count: int = 10) -> list[str]:
     """Generate a list of backup codes for 2FA recovery."""
-    return [secrets.token_hex(4).upper() for _ in range(count)]
+    # Draw all the entropy in one call, then split into 8-hex-char codes
+    digits = secrets.token_bytes(4 * count).hex().upper()
+    return [digits[i : i + 8] for i in range(0, 8 * count, 8)]
+
+
+def _normalize_backup_code(code: str) -> str:
+    """Uppercase a backup code and strip the separators users tend to type."""
+    return code.upper().replace("-", "").replace(" ", "")
+
+
+def _hash_backup_code(code: str) -> str:
+    return hashlib.sha256(_normalize_backup_code(code).encode("utf-8")).hexdigest()
+
+
+def _backup_code_bytes(code: str) -> bytes | None:
+    """Normalize a submitted backup code, or return None if it can't be one."""
+    normalized = _normalize_backup_code(code)
+    if not _BACKUP_CODE_SHAPE.fullmatch(normalized):
+        return None
+    return normalized.encode("ascii")
 
 
 def encode_backup_codes(codes: list[str]) -> str:
     """
     Hash and encode backup codes for secure database storage.
 
-    Backup codes are hashed with bcrypt before storage so they cannot
-    be read if the database is compromised.
+    Backup codes are stored as unsalted SHA-256 digests. That keeps them out
+    of plain sight, but it is not protection against a database leak: each
+    code has only 32 bits of entropy, so a leaked digest can be brute-forced,
+    and the TOTP secret in the same row already bypasses 2FA. They are
+    random, single-use, and only usable alongside the account password, so
+    a slow hash like bcrypt would not change that while costing a full
+    bcrypt verify per stored code on every attempt.
     """
-    hashed_codes = [
-        bcrypt.hashpw(code.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-        for code in codes
-    ]
-    return json.dumps(hashed_codes)
+    return "\n".join(sorted(_hash_backup_code(code) for code in codes))
 
 
 def decode_backup_codes(encoded: str | None) -> list[str]:
@@ -74,10 +163,36 @@ def decode_backup_codes(encoded: str | None) -> list[str]:
     Decode backup codes from database storage.
 
     Note: Returns hashed codes. Use verify_backup_code() for verification.
+    Codes are stored newline-separated; older rows hold a JSON array.
     """
     if not encoded:
         return []
-    return json.loads(encoded)
+    if encoded.startswith("["):
+        return json.loads(encoded)
+    return encoded.split("\n")
+
+
+def _backup_code_matches(stored_hash: str, digest: str, normalized: bytes) -> bool:
+    """Check one stored backup code against a submitted code."""
+    if stored_hash.startswith("$2"):
+        # Codes issued before the switch to SHA-256 are bcrypt hashes
+        return bcrypt.checkpw(normalized, stored_hash.encode("ascii"))
+    return hmac.compare_digest(stored_hash, digest)
+
+
+def _consume_backup_code(
+    hashed_codes: list[str], matches: list[bool]
+) -> tuple[bool, str | None]:
+    """Drop the matched code from storage, if any, and re-encode the rest."""
+    # Every slot has already been checked; if more than one matched (say a
+    # legacy bcrypt row next to its SHA-256 twin) the first one is used up
+    match = next((i for i, is_match in enumerate(matches) if is_match), None)
+    if match is None:
+        return False, None
+
+    # Remove the used code
+    remaining_codes = hashed_codes[:match] + hashed_codes[match + 1 :]
+    return True, "\n".join(remaining_codes) if remaining_codes else None
 
 
 def verify_backup_code(encoded_codes: str | None, code: str) -> tuple[bool, str | None]:
@@ -86,40 +201,96 @@ def verify_backup_code(encoded_codes: str | None, code: str) -> tuple[bool, str
 
     Returns (is_valid, new_encoded_codes).
     Backup codes are single-use, so the used code is removed after successful verification.
+
+    Legacy bcrypt rows are checked one after another, which can block for
+    seconds. Don't call this on the event loop; use verify_backup_code_async.
     """
     hashed_codes = decode_backup_codes(encoded_codes)
-    if not hashed_codes:
+    normalized = _backup_code_bytes(code)
+    if not hashed_codes or normalized is None:
         return False, None
 
-    # Normalize the input code (uppercase, no spaces/dashes)
-    normalized_code = code.upper().replace("-", "").replace(" ", "")
+    digest = hashlib.sha256(normalized).hexdigest()
 
-    for i, stored_hash in enumerate(hashed_codes):
-        if bcrypt.checkpw(normalized_code.encode("utf-8"), stored_hash.encode("utf-8")):
-            # Remove the used code
-            remaining_codes = hashed_codes[:i] + hashed_codes[i + 1 :]
-            return True, json.dumps(remaining_codes) if remaining_codes else None
+    # Every slot is checked, no early exit
+    matches = [_backup_code_matches(h, digest, normalized) for h in hashed_codes]
+    return _consume_backup_code(hashed_codes, matches)
 
-    return False, None
 
+async def verify_backup_code_async(
+    encoded_codes: str | None, code: str
+) -> tuple[bool, str | None]:
+    """Verify a backup code, checking legacy bcrypt hashes in parallel off the loop."""
+    hashed_codes = decode_backup_codes(encoded_codes)
+    normalized = _backup_code_bytes(code)
+    if not hashed_codes or normalized is None:
+        # Don't queue a bcrypt per slot for a code that can't match any of them
+        return False, None
 
-def generate_qr_code_data_url(uri: str) -> str:
-    """Generate a QR code as a data URL for frontend display."""
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
+    digest = hashlib.sha256(normalized).hexdigest()
+
+    if not any(h.startswith("$2") for h in hashed_codes):
+        # SHA-256 digests only: microseconds, no need to leave the loop
+        matches = [_backup_code_matches(h, digest, normalized) for h in hashed_codes]
+    else:
+        loop = asyncio.get_running_loop()
+        matches = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    _HASH_POOL, _backup_code_matches, h, digest, normalized
+                )
+                for h in hashed_codes
+            )
+        )
+    return _consume_backup_code(hashed_codes, matches)
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    body = chunk_type + data
+    return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+
+def _qr_to_png(matrix: tuple[bytearray, ...], scale: int, border: int) -> bytes:
+    """
+    Encode a QR module matrix as a 1-bit greyscale PNG.
+
+    Each module row becomes one packed scanline (dark = 0, light = 1) that is
+    repeated scale times, so the bit packing runs per module row rather than
+    per pixel. Only IHDR, IDAT and IEND are written.
+    """
+    size = (len(matrix) + 2 * border) * scale
+    row_bytes = (size + 7) // 8
+    padding = row_bytes * 8 - size
+    quiet = "1" * (border * scale)
+
+    # Filter type 0 (None) prefixes every scanline
+    blank_line = b"\x00" + b"\xff" * row_bytes
+    lines = [blank_line * (border * scale)]
+    for row in matrix:
+        bits = quiet + "".join("0" * scale if m else "1" * scale for m in row)
+        bits += quiet + "1" * padding
+        line = b"\x00" + int(bits, 2).to_bytes(row_bytes, "big")
+        lines.append(line * scale)
+    lines.append(blank_line * (border * scale))
+
+    # width, height, bit depth 1, colour type 0 (greyscale), deflate, no interlace
+    header = struct.pack(">IIBBBBB", size, size, 1, 0, 0, 0, 0)
+    return b"".join(
+        (
+            b"\x89PNG\r\n\x1a\n",
+            _png_chunk(b"IHDR", header),
+            _png_chunk(b"IDAT", zlib.compress(b"".join(lines), 9)),
+            _png_chunk(b"IEND", b""),
+        )
     )
-    qr.add_data(uri)
-    qr.make(fit=True)
 
-    img = qr.make_image(fill_color="black", back_color="white")
 
-    # Convert to base64 data URL
-    buffer = io.BytesIO()
-    img.save(buffer, format="PNG")
-    buffer.seek(0)
-    img_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+def generate_qr_code_data_url(uri: str) -> str:
+    """Generate a QR code as a data URL for frontend display."""
+    # A 1-bit PNG packed straight from the module matrix: a fraction of the
+    # size of an RGB raster or SVG path, with no metadata chunks
+    qr = segno.make_qr(uri, error="l")
+    png = _qr_to_png(qr.matrix, scale=10, border=4)
 
-    return f"data:image/png;base64,{img_base64}"
+    png_base64 = base64.b64encode(png).decode("ascii")
+    return f"data:image/png;base64,{png_base64}"
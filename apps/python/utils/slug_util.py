@@ -1,8 +1,34 @@
 """Slug generation utilities."""
 
+import functools
 import re
 
 
+class _SlugTable(dict):
+    """
+    str.translate table: lowercase ASCII letters and digits, map whitespace and
+    hyphens to "-", drop everything else.
+
+    Each code point is resolved from its lowercase form the first time it is
+    seen (non-ASCII can still lower to ASCII, e.g. the Kelvin sign), then
+    served from the dict by translate's C loop.
+    """
+
+    def __missing__(self, codepoint: int) -> str:
+        mapped = "".join(
+            "-" if c.isspace() or c == "-" else c if c.isascii() and c.isalnum() else ""
+            for c in chr(codepoint).lower()
+        )
+        self[codepoint] = mapped
+        return mapped
+
+
+_SLUG_TABLE = _SlugTable()
+
+_REPEATED_HYPHENS = re.compile(r"-+")
+
+
+@functools.lru_cache(maxsize=8192)
 def generate_slug(title: str) -> str:
     """
     Generate a URL-friendly slug from title.
@@ -13,8 +39,5 @@ def generate_slug(title: str) -> str:
     Example:
         "Wedding Photos 2024!" -> "wedding-photos-2024"
     """
-    # Convert to lowercase and replace spaces/special chars with hyphens
-    slug = re.sub(r"[^a-zA-Z0-9\s-]", "", title.lower())
-    slug = re.sub(r"[\s_]+", "-", slug)
-    slug = re.sub(r"-+", "-", slug).strip("-")
-    return slug
+    # Lowercase, filter and turn separators into hyphens in one translate pass
+    return _REPEATED_HYPHENS.sub("-", title.translate(_SLUG_TABLE)).strip("-")
@@ -3,6 +3,44 @@
 from fastapi import Request
 
 
+def _share_base_url(request: Request) -> str:
+    """
+    Resolve "{scheme}://{host}/share/" for a request, once per request.
+
+    Scans the raw ASGI headers (already lowercase bytes) in a single pass and
+    caches the result on request.state, so listing many share links doesn't
+    repeat the lookups per link.
+    """
+    base_url = getattr(request.state, "share_base_url", None)
+    if base_url is not None:
+        return base_url
+
+    forwarded_proto = forwarded_host = host = None
+    for name, value in request.scope["headers"]:
+        # First occurrence wins, as with request.headers.get()
+        if name == b"x-forwarded-proto" and forwarded_proto is None:
+            forwarded_proto = value
+        elif name == b"x-forwarded-host" and forwarded_host is None:
+            forwarded_host = value
+        elif name == b"host" and host is None:
+            host = value
+
+    # Get scheme (http/https) - check X-Forwarded-Proto first (set by reverse proxy)
+    scheme = (
+        forwarded_proto.decode("latin-1")
+        if forwarded_proto is not None
+        else request.scope.get("scheme", "http")
+    )
+
+    # Get host from X-Forwarded-Host (reverse proxy) or Host header
+    host = forwarded_host if forwarded_host is not None else host
+    host = host.decode("latin-1") if host is not None else "localhost"
+
+    base_url = f"{scheme}://{host}/share/"
+    request.state.share_base_url = base_url
+    return base_url
+
+
 def build_share_url(
     token: str, request: Request, custom_slug: str | None = None
 ) -> str:
@@ -14,15 +52,5 @@ def build_share_url(
 
     If custom_slug is provided, uses that instead of the token for a friendlier URL.
     """
-    # Get scheme (http/https) - check X-Forwarded-Proto first (set by reverse proxy)
-    scheme = request.headers.get("x-forwarded-proto", request.url.scheme)
-
-    # Get host from X-Forwarded-Host (reverse proxy) or Host header
-    host = request.headers.get(
-        "x-forwarded-host", request.headers.get("host", "localhost")
-    )
-
     # Use custom slug if provided, otherwise use token
-    identifier = custom_slug if custom_slug else token
-
-    return f"{scheme}://{host}/share/{identifier}"
+    return _share_base_url(request) + (custom_slug or token)